@@ -0,0 +1,12 @@
+"""Benchmarks for Easylog hot paths
+
+Run the suite and save the results as JSON::
+
+    python -m benchmarks run --output results.json
+
+Compare two saved runs, e.g. before and after a change::
+
+    python -m benchmarks compare before.json after.json
+
+The standalone microbenchmarks in this package can also be run as scripts
+"""
@@ -0,0 +1,106 @@
+import argparse
+import json
+import sys
+
+from benchmarks import hotpaths
+
+
+def _int_list(text):
+    return tuple(int(value) for value in text.split(','))
+
+
+def _str_list(text):
+    return tuple(text.split(','))
+
+
+def _format_result(result):
+    text = ('{handlertype:<8} handlers={handlercount:<2} '
+            'size={messagesize:<4} threads={threadcount:<2} '
+            '{level:<8} queued={queued!s:<5}').format(**result)
+    text += ' {0:>12,.0f} msg/s  p50={1:>6}ns  p99={2:>7}ns'.format(
+        result['messages_per_second'], result['latency_ns']['p50'],
+        result['latency_ns']['p99'])
+
+    return text
+
+
+def run(args):
+    suite = hotpaths.run_suite(
+        handlertypes=args.handlers, handlercounts=args.counts,
+        messagesizes=args.sizes, threadcounts=args.threads,
+        levels=args.levels, calls=args.calls,
+        queued=(False, True) if args.queued else (False,),
+        progress=lambda result: print(_format_result(result)))
+
+    if args.label is not None:
+        suite['meta']['label'] = args.label
+
+    if args.output is not None:
+        with open(args.output, 'w') as fh:
+            json.dump(suite, fh, indent=2)
+
+
+def compare(args):
+    with open(args.before) as fh:
+        before = json.load(fh)
+
+    with open(args.after) as fh:
+        after = json.load(fh)
+
+    before_results = {hotpaths.scenario_key(result): result
+                      for result in before['results']}
+
+    for result in after['results']:
+        old = before_results.get(hotpaths.scenario_key(result))
+
+        if old is None:
+            continue
+
+        change = (result['messages_per_second'] /
+                  old['messages_per_second'] - 1) * 100
+        flag = ''
+
+        if change <= -args.threshold:
+            flag = '  REGRESSION'
+
+        print('{0}  {1:+7.1f}%{2}'.format(_format_result(result), change,
+                                          flag))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmark suite')
+    run_parser.add_argument('--handlers', type=_str_list,
+                            default=hotpaths.HANDLER_TYPES)
+    run_parser.add_argument('--counts', type=_int_list,
+                            default=hotpaths.HANDLER_COUNTS)
+    run_parser.add_argument('--sizes', type=_int_list,
+                            default=hotpaths.MESSAGE_SIZES)
+    run_parser.add_argument('--threads', type=_int_list,
+                            default=hotpaths.THREAD_COUNTS)
+    run_parser.add_argument('--levels', type=_str_list,
+                            default=hotpaths.LEVELS)
+    run_parser.add_argument('--calls', type=int, default=20000,
+                            help='calls per thread in each scenario')
+    run_parser.add_argument('--queued', action='store_true',
+                            help='also run every scenario with queued=True')
+    run_parser.add_argument('--label', help='stored with the results')
+    run_parser.add_argument('--output', help='JSON file for the results')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser(
+        'compare', help='compare two saved runs')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=5.0,
+                                help='percent drop reported as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Microbenchmark for log calls below every handler's log level
+
+Compares a disabled `Easylog.log_debug` call with a disabled call on a plain
+`logging.Logger` and with an empty method call, which is the floor for any
+method-based API. Run from the repository root::
+
+    python -m benchmarks.bench_disabled
+"""
+import io
+import logging
+import timeit
+
+import easylog
+
+
+def _per_call(stmt, number):
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+
+    return best / number * 1e9
+
+
+def main(number=1000000):
+    stream = io.StringIO()
+
+    mylogger = easylog.Easylog(loggername='bench_disabled',
+                               create_console=False)
+    mylogger.add_streamlogger(stream, loglevel='info')
+
+    plain_logger = logging.getLogger('bench_disabled_plain')
+    plain_logger.setLevel(logging.INFO)
+
+    class Empty:
+        def log_debug(self, msg):
+            pass
+
+    empty = Empty()
+
+    results = [
+        ('empty method call', lambda: empty.log_debug('message')),
+        ('logging.Logger.debug', lambda: plain_logger.debug('message')),
+        ('Easylog.log_debug', lambda: mylogger.log_debug('message')),
+        ('Easylog.log_debug (template)',
+         lambda: mylogger.log_debug('message {0}', 1)),
+    ]
+
+    for name, stmt in results:
+        print('{0:<32} {1:8.1f} ns/call'.format(name, _per_call(stmt, number)))
+
+    mylogger.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Microbenchmark for the formatters used by Easylog
+
+Compares a plain `logging.Formatter` using the default file format of
+`Easylog` with `CachedTimeFormatter` on the same format, and with
+`JsonFormatter`, on the same record. Run from the repository root::
+
+    python -m benchmarks.bench_formatters
+"""
+import logging
+import timeit
+
+from easylog.easylog import _default_log_format
+from easylog.formatters import CachedTimeFormatter, JsonFormatter
+
+
+def _per_call(stmt, number):
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+
+    return best / number * 1e9
+
+
+def main(number=200000):
+    record = logging.LogRecord('easylog', logging.INFO, __file__, 1,
+                               'request %s finished in %d ms', ('abc', 12),
+                               None)
+    logformat = _default_log_format('file')
+    dateformat = "%Y-%m-%dT%H:%M:%S"
+
+    text_formatter = logging.Formatter(logformat, dateformat)
+    cached_formatter = CachedTimeFormatter(logformat, dateformat)
+    json_formatter = JsonFormatter(datefmt=dateformat)
+
+    results = [
+        ('logging.Formatter', lambda: text_formatter.format(record)),
+        ('CachedTimeFormatter', lambda: cached_formatter.format(record)),
+        ('JsonFormatter', lambda: json_formatter.format(record)),
+    ]
+
+    for name, stmt in results:
+        print('{0:<20} {1:8.1f} ns/record'.format(name,
+                                                   _per_call(stmt, number)))
+
+    print(json_formatter.format(record))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Throughput of many threads logging to one file at once
+
+Compares the default mode, where every thread takes the handler's lock to
+format and write, with `queued=True` and `threadbuffered=True`, as the number
+of threads grows. Run from the repository root::
+
+    python -m benchmarks.bench_threads
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import easylog
+
+
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32)
+MODES = ('default', 'queued', 'threadbuffered')
+
+
+def run(mode, threadcount, calls, workdir):
+    mylogger = easylog.Easylog(loggername='bench_threads',
+                               create_console=False,
+                               queued=mode == 'queued',
+                               threadbuffered=mode == 'threadbuffered')
+    mylogger.add_filelogger(os.path.join(workdir, mode + '.log'),
+                            appendtime=False, mode='w')
+
+    barrier = threading.Barrier(threadcount + 1)
+
+    def worker():
+        barrier.wait()
+
+        for call in range(calls):
+            mylogger.log_info('message {0}', call)
+
+    threads = [threading.Thread(target=worker) for _ in range(threadcount)]
+
+    for a_thread in threads:
+        a_thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for a_thread in threads:
+        a_thread.join()
+
+    mylogger.flush()
+    elapsed = time.perf_counter() - start
+
+    mylogger.close()
+
+    return threadcount * calls / elapsed
+
+
+def main(calls=5000):
+    workdir = tempfile.mkdtemp(prefix='easylog-bench-')
+
+    try:
+        print('{0:>8}'.format('threads') +
+              ''.join('{0:>16}'.format(a_mode) for a_mode in MODES))
+
+        for threadcount in THREAD_COUNTS:
+            rates = [run(a_mode, threadcount, calls, workdir)
+                     for a_mode in MODES]
+            print('{0:>8}'.format(threadcount) +
+                  ''.join('{0:>12,.0f} m/s'.format(rate) for rate in rates))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Throughput and latency of the log_* methods
+
+Each scenario creates an `Easylog` with a number of handlers of one type,
+then calls `log_info` (enabled) or `log_debug` (disabled) from one or more
+threads. Every call is timed individually for latency percentiles, and the
+whole run is timed for messages per second
+"""
+import datetime as dt
+import itertools
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import easylog
+
+
+HANDLER_TYPES = ('console', 'file', 'stream')
+HANDLER_COUNTS = (1, 4)
+MESSAGE_SIZES = (16, 256)
+THREAD_COUNTS = (1, 4)
+LEVELS = ('enabled', 'disabled')
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class _NullStream:
+    """A stream that discards everything, so stream handlers cost no I/O"""
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def run_scenario(handlertype, handlercount, messagesize, threadcount, level,
+                 calls=20000, queued=False, workdir=None):
+    """Run one scenario and return its results as a dict
+
+    Arguements:
+        handlertype : str
+            One of 'console', 'file' or 'stream'
+        handlercount : int
+            Number of handlers of `handlertype`, all at log level 'info'
+        messagesize : int
+            Number of characters in each message
+        threadcount : int
+            Number of threads logging at the same time
+        level : str
+            'enabled' calls `log_info`, 'disabled' calls `log_debug`
+        calls : int (default 20000)
+            Number of calls made by each thread
+        queued : bool (default `False`)
+            Passed to `Easylog`
+        workdir : str (default `None`)
+            Directory for log files. If `None`, a temporary directory is used
+    """
+    cleanup = workdir is None
+
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix='easylog-bench-')
+
+    devnull = open(os.devnull, 'w')
+    mylogger = easylog.Easylog(loggername='bench', create_console=False,
+                               queued=queued)
+
+    for counter in range(handlercount):
+        if handlertype == 'console':
+            mylogger.add_consolelogger(loglevel='info')
+            # Keep the terminal quiet, the handler is otherwise unchanged
+            mylogger._handlers[-1]['handler'].setStream(devnull)
+        elif handlertype == 'file':
+            logpath = os.path.join(workdir, 'bench{0}.log'.format(counter))
+            mylogger.add_filelogger(logpath, appendtime=False,
+                                    loglevel='info')
+        elif handlertype == 'stream':
+            mylogger.add_streamlogger(_NullStream(), loglevel='info')
+        else:
+            raise ValueError("Unknown handler type " + repr(handlertype))
+
+    if level == 'enabled':
+        log_method = mylogger.log_info
+    else:
+        log_method = mylogger.log_debug
+
+    msg = 'x' * messagesize
+    latencies = [None] * threadcount
+    barrier = threading.Barrier(threadcount + 1)
+
+    def worker(index):
+        timings = [0] * calls
+        clock = time.perf_counter_ns
+
+        barrier.wait()
+
+        for call in range(calls):
+            start = clock()
+            log_method(msg)
+            timings[call] = clock() - start
+
+        latencies[index] = timings
+
+    threads = [threading.Thread(target=worker, args=(index,))
+               for index in range(threadcount)]
+
+    for a_thread in threads:
+        a_thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for a_thread in threads:
+        a_thread.join()
+
+    mylogger.flush()
+    elapsed = time.perf_counter() - start
+
+    mylogger.close()
+    devnull.close()
+
+    if cleanup:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    all_latencies = sorted(itertools.chain.from_iterable(latencies))
+    total = len(all_latencies)
+
+    result = {'handlertype': handlertype, 'handlercount': handlercount,
+              'messagesize': messagesize, 'threadcount': threadcount,
+              'level': level, 'queued': queued, 'calls': total,
+              'seconds': elapsed, 'messages_per_second': total / elapsed,
+              'latency_ns': {'mean': sum(all_latencies) / total,
+                             'max': all_latencies[-1]}}
+
+    for a_percentile in PERCENTILES:
+        index = min(total - 1, int(total * a_percentile / 100))
+        result['latency_ns']['p' + str(a_percentile)] = all_latencies[index]
+
+    return result
+
+
+def run_suite(handlertypes=HANDLER_TYPES, handlercounts=HANDLER_COUNTS,
+              messagesizes=MESSAGE_SIZES, threadcounts=THREAD_COUNTS,
+              levels=LEVELS, calls=20000, queued=(False,), progress=None):
+    """Run every combination of the given scenario settings
+
+    Returns a dict with information about the environment under `'meta'` and
+    one result per scenario under `'results'`. See `run_scenario`
+
+    Arguements:
+        progress : callable (default `None`)
+            If given, called with each scenario's result as it finishes
+    """
+    results = list()
+    grid = itertools.product(handlertypes, handlercounts, messagesizes,
+                             threadcounts, levels, queued)
+
+    for (handlertype, handlercount, messagesize, threadcount, level,
+         is_queued) in grid:
+        result = run_scenario(handlertype, handlercount, messagesize,
+                              threadcount, level, calls=calls,
+                              queued=is_queued)
+        results.append(result)
+
+        if progress is not None:
+            progress(result)
+
+    meta = {'python': sys.version.split()[0],
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'created': dt.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+    return {'meta': meta, 'results': results}
+
+
+def scenario_key(result):
+    """The settings that identify a scenario across runs"""
+    return (result['handlertype'], result['handlercount'],
+            result['messagesize'], result['threadcount'], result['level'],
+            result.get('queued', False))
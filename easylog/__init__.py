@@ -1 +1,2 @@
 from easylog.easylog import Easylog
+from easylog.reader import LogEntry, LogReader
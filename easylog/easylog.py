@@ -1,7 +1,25 @@
+import asyncio
+import concurrent.futures
+import functools
 import logging
+import logging.handlers
+import multiprocessing
 import os
+import queue
+import sys
+import threading
+import traceback
 import datetime as dt
 
+from easylog.formatters import (DEFAULT_JSON_FIELDS, CachedTimeFormatter,
+                                JsonFormatter, encode_fields, traceback_key)
+from easylog.handlers import (BoundedStreamHandler, BufferedFileHandler,
+                              CompressedStreamHandler, HandlerStats,
+                              InProcessQueueHandler, MmapFileHandler,
+                              NetworkHandler, RingBufferHandler,
+                              RotatingFileHandler, ThreadBufferHandler)
+from easylog.policies import LogPolicy
+
 
 class Easylog:
     """Fast and easy logging with Easylog
@@ -74,7 +92,7 @@ class Easylog:
     """
 
     def __init__(self, loggername=None, globallevel='info',
-                 create_console=True):
+                 create_console=True, queued=False, threadbuffered=False):
         """ Easylog constructor
 
         Creates an instance of `Easylog`
@@ -93,20 +111,68 @@ class Easylog:
             create_console : bool (defaults to True)
                 If true, `Easylog` will create a console logger with default
                 settings
+            queued : bool (defaults to False)
+                If true, every handler created by the add_*logger methods is
+                placed behind an in-process queue. The log_* methods render
+                the message and return as soon as the record is enqueued, and
+                a background thread formats the log line and any traceback and
+                does the I/O. Call `close` to drain the queue
+            threadbuffered : bool (defaults to False)
+                If true, each logging thread appends records to a buffer of
+                its own, without taking any shared lock, and a single writer
+                thread passes them to the handlers in the order they were
+                logged. Meant for many threads logging at once. Cannot be
+                combined with `queued`
         """
+        if queued is True and threadbuffered is True:
+            errmsg = "'queued' cannot be combined with 'threadbuffered'"
+            raise ValueError(errmsg)
+
         self._handlers = list()
+        self._local = threading.local()
+        self._filtercounts = list()
+        self._statslock = threading.Lock()
+        self._policies = dict()
+        self._tracebacks = set()
+        self._tracebacklock = threading.Lock()
+        self._tracebackpolicy = LogPolicy(suppressrepeats=_COLLAPSE_WINDOW)
         self._loggername = __name__ if loggername is None else loggername
         self._globallevel = _string2loglevel(globallevel)
         self._filecounter = 0
-        self._namecounters = {'file': 0, 'console': 0, 'stream': 0}
+        self._namecounters = {'file': 0, 'console': 0, 'stream': 0,
+                              'queue': 0, 'memory': 0, 'network': 0}
         self._dateformats = {'file': "%Y-%m-%dT%H:%M:%S",
                              'stream': "%Y-%m-%dT%H:%M:%S",
-                             'console': "%I:%M:%S %p"}
+                             'console': "%I:%M:%S %p",
+                             'queue': None,
+                             'memory': "%Y-%m-%dT%H:%M:%S",
+                             'network': "%Y-%m-%dT%H:%M:%S"}
         self._lognames = list()
 
-        # logging.basicConfig(level=logging.DEBUG)
         self._logger = logging.getLogger(self._loggername)
         self._logger.setLevel(logging.DEBUG)
+        self._build_leveltable()
+
+        self._queued = queued
+        self._queue = None
+        self._queuehandler = None
+        self._queuelistener = None
+        self._threadbuffer = None
+        self._listeners = list()
+        self._executor = None
+
+        if queued is True:
+            self._queue = queue.Queue(-1)
+            self._queuehandler = InProcessQueueHandler(self._queue)
+            self._queuelistener = logging.handlers.QueueListener(
+                self._queue, respect_handler_level=True)
+
+            self._logger.addHandler(self._queuehandler)
+            self._queuelistener.start()
+
+        if threadbuffered is True:
+            self._threadbuffer = ThreadBufferHandler()
+            self._logger.addHandler(self._threadbuffer)
 
         if create_console is True:
             self.add_consolelogger()
@@ -141,12 +207,90 @@ class Easylog:
         """
         return self._get_handler_names()
 
+    @property
+    def queued(self):
+        """Whether handlers sit behind a queue and a background writer
+
+        bool: Set during object construction. See `Easylog.__init__`
+        """
+        return self._queued
+
     def close(self):
+        """Close all handlers
+
+        If `Easylog` is queued or thread buffered, every pending record is
+        written and the background writer thread is stopped before the
+        handlers are closed. The same
+        applies to queues started with `listen`
+        """
+        for a_level, a_policy in self._policies.items():
+            for a_summary in a_policy.flush():
+                self._logger.log(a_level, a_summary)
+
+        for a_summary in self._tracebackpolicy.flush():
+            self._logger.log(logging.ERROR, a_summary)
+
+        for a_listener in self._listeners:
+            a_listener.stop()
+
+        self._listeners.clear()
+
+        if self._queuelistener is not None:
+            self._queuelistener.stop()
+            self._logger.removeHandler(self._queuehandler)
+
+            self._queuelistener = None
+            self._queuehandler = None
+
+        if self._threadbuffer is not None:
+            self._threadbuffer.close()
+            self._logger.removeHandler(self._threadbuffer)
+
+            self._threadbuffer = None
+
         for a_handler in self._handlers:
+            self._logger.removeHandler(a_handler['handler'])
             a_handler['handler'].close()
 
+    def flush(self):
+        """Write out everything logged so far
+
+        If `Easylog` is queued or thread buffered, waits for the background
+        writer to handle every record. Then flushes every handler
+        """
+        if self._queuelistener is not None:
+            self._queue.join()
+
+        if self._threadbuffer is not None:
+            self._threadbuffer.flush()
+
+        for a_handler in self._handlers:
+            a_handler['handler'].flush()
+
+    async def aflush(self):
+        """Awaitable `flush`, run off the event loop"""
+        await self._run_in_executor(self.flush)
+
+    async def aclose(self):
+        """Awaitable `close`, run off the event loop"""
+        await self._run_in_executor(self.close)
+
+        self._executor.shutdown()
+        self._executor = None
+
+    def _run_in_executor(self, func, *args):
+        # A single worker thread keeps records in the order they were logged
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='easylog')
+
+        loop = asyncio.get_running_loop()
+
+        return loop.run_in_executor(self._executor,
+                                    functools.partial(func, *args))
+
     def _log_controls(self, logtype, logname=None, loglevel=None,
-                      logformat=None, dateformat=None):
+                      logformat=None, dateformat=None, structured=False):
         if logname is None:
             logname = logtype + str(self._namecounters[logtype])
             self._namecounters[logtype] += 1
@@ -160,12 +304,19 @@ class Easylog:
             loglevel = _string2loglevel(loglevel)
 
         if logformat is None:
-            logformat = _default_log_format(logtype)
+            if structured is True:
+                logformat = DEFAULT_JSON_FIELDS
+            else:
+                logformat = _default_log_format(logtype)
+        elif structured is True and isinstance(logformat, str):
+            errmsg = ("A structured 'logformat' must be a sequence of field "
+                      "names, not a format string")
+            raise ValueError(errmsg)
 
         if dateformat is None:
             dateformat = self._dateformats[logtype]
 
-        logformat = logging.Formatter(logformat, dateformat)
+        logformat = _build_formatter(logformat, dateformat)
 
         log_controls = {'logtype': logtype, 'logname': logname,
                         'loglevel': loglevel, 'logformat': logformat,
@@ -177,25 +328,169 @@ class Easylog:
         log_handler.setLevel(log_controls['loglevel'])
         log_handler.setFormatter(log_controls['logformat'])
 
-        self._logger.addHandler(log_handler)
+        log_stats = HandlerStats()
+        log_stats.instrument(log_handler)
+
+        if self._queuelistener is not None:
+            self._queuelistener.handlers += (log_handler,)
+        elif self._threadbuffer is not None:
+            self._threadbuffer.handlers += (log_handler,)
+        else:
+            self._logger.addHandler(log_handler)
 
         log_rec = _logger_record(log_handler, log_controls['logname'],
                                  log_controls['logtype'],
                                  log_controls['loglevel'],
-                                 log_controls['dateformat'])
+                                 log_controls['dateformat'], log_stats)
 
-        self._handlers.append(log_rec)
+        with self._statslock:
+            self._fold_filtered()
+            self._handlers.append(log_rec)
+            self._build_leveltable()
 
     def add_streamlogger(self, stream, logname=None, loglevel=None,
-                         logformat=None, dateformat=None):
+                         logformat=None, dateformat=None, structured=False,
+                         compressoutput=None, maxqueue=None, overflow='block',
+                         overflowlevel='warning', spillpath=None):
+        """ Add a stream logger
+
+        Writes log statements to `stream`. Creates a `logging.StreamHandler`
+        internally to handle stream logging
+
+        Arguements:
+            stream
+                Any file-like object with `write` and `flush` methods. The
+                same as `logging.StreamHandler`
+            logname : str (default `None`)
+                The name of the handler. If `None`, a name is automatically
+                assigned as `stream`, plus a counter e.g. `stream0`
+            loglevel : str (default `None`)
+                The log level of the handler. Lowercase names of `logging` log
+                levels i.e. 'info', 'critical', etc. If `None, it is set to
+                the global log level. See `Easylog.globallevel`
+            logformat : str or sequence of str (default `None`)
+                The log format for the handler. The same format as defined in
+                Python's `logging` module. If a sequence, the names of the
+                fields of structured JSON output. If `None`, sets internal
+                defaults
+            dateformat : str (default `None`)
+                The date format for the handler. The same as used in the
+                `datetime` module. If `None`, sets internal defaults
+            structured : bool (default `False`)
+                If `True`, each record is written as one JSON object per line,
+                with the fields 'time', 'name', 'level' and 'message' unless
+                `logformat` names others. A str `logformat` raises
+                `ValueError`
+            compressoutput : str (default `None`)
+                Compress the output with 'gzip' or 'xz' on a background
+                thread. Records are buffered and each write is a complete
+                compressed frame. `stream` must be binary, or have a binary
+                `buffer` attribute like `sys.stdout`. Cannot be combined with
+                `maxqueue`
+            maxqueue : int (default `None`)
+                If set, records are buffered, at most `maxqueue` of them, and
+                written by a background thread, so a slow reader of the
+                stream does not stall logging until the buffer is full
+            overflow : str (default 'block')
+                Only used if `maxqueue` is set. What to do with a new record
+                when the buffer is full: 'block' waits for room,
+                'drop-oldest' drops the oldest buffered record,
+                'drop-below-level' drops the new record if it is below
+                `overflowlevel` and waits otherwise, 'spill-to-file' appends
+                the new record to `spillpath`. See `stats` for the number of
+                records dropped and spilled
+            overflowlevel : str (default 'warning')
+                Only used by 'drop-below-level'
+            spillpath : str (default `None`)
+                Only used by 'spill-to-file', where it is required
+        """
+        if compressoutput is not None and maxqueue is not None:
+            errmsg = "'compressoutput' cannot be combined with 'maxqueue'"
+            raise ValueError(errmsg)
+
         log_controls = self._log_controls('stream', logname, loglevel,
-                                          logformat, dateformat)
-        log_handler = logging.StreamHandler(stream=stream)
+                                          logformat, dateformat, structured)
+
+        if compressoutput is not None:
+            log_handler = CompressedStreamHandler(stream, compressoutput)
+        else:
+            log_handler = _stream_handler(stream, maxqueue, overflow,
+                                          overflowlevel, spillpath)
 
         self._add_logger(log_handler, log_controls)
 
+    def add_queuelogger(self, queue, logname=None, loglevel=None):
+        """ Add a queue logger
+
+        Sends log records to `queue` instead of writing them. Meant for worker
+        processes, with one writer process calling `listen` on the same queue
+        and owning the file loggers, so that records from all workers are
+        written by a single handler per file
+
+        Creates a `logging.handlers.QueueHandler` internally. Records are sent
+        with their message already rendered, the writer process applies the
+        log format
+
+        Arguements:
+            queue
+                The queue returned by `listen` in the writer process, or any
+                queue with a `put_nowait` method
+            logname : str (default `None`)
+                The name of the handler. If `None`, a name is automatically
+                assigned as `queue`, plus a counter e.g. `queue0`
+            loglevel : str (default `None`)
+                The log level of the handler. Lowercase names of `logging` log
+                levels i.e. 'info', 'critical', etc. If `None, it is set to
+                the global log level. See `Easylog.globallevel`
+        """
+        log_controls = self._log_controls('queue', logname, loglevel)
+        log_handler = logging.handlers.QueueHandler(queue)
+
+        self._add_logger(log_handler, log_controls)
+
+    def listen(self, queue=None):
+        """Write records sent by queue loggers in other processes
+
+        Starts a background thread that takes records off `queue` and passes
+        them to this instance's handlers. Records keep the logger name of the
+        process that sent them. The thread is stopped by `close`, after the
+        queue is drained
+
+        Example:
+            The writer process owns the log file, workers only send records::
+
+                >>> writer = easylog.Easylog(create_console=False)
+                >>> writer.add_filelogger('app.log')
+                >>> log_queue = writer.listen()
+                >>> # in each worker process, given log_queue
+                >>> worker = easylog.Easylog(create_console=False)
+                >>> worker.add_queuelogger(log_queue)
+
+        Arguements:
+            queue (default `None`)
+                The queue to read records from. If `None`, a
+                `multiprocessing.Queue` is created. Use a
+                `multiprocessing.Manager().Queue()` if the queue has to be
+                passed as an argument to pool tasks
+
+        Returns:
+            The queue to pass to `add_queuelogger` in other processes
+        """
+        if queue is None:
+            queue = multiprocessing.Queue(-1)
+
+        # A logger has the `handle` method of a handler, so the listener
+        # dispatches to whatever handlers this instance has at the time
+        listener = logging.handlers.QueueListener(queue, self._logger)
+        listener.start()
+
+        self._listeners.append(listener)
+
+        return queue
+
     def add_consolelogger(self, logname=None, loglevel=None, logformat=None,
-                          dateformat=None):
+                          dateformat=None, maxqueue=None, overflow='block',
+                          overflowlevel='warning', spillpath=None):
         """ Add a console logger
 
         Prints log statements to console. Creates a `logging.StreamHandler`
@@ -219,16 +514,38 @@ class Easylog:
                 The values to be passed to `stream` is the same as
                 `logging.StreamHandler`. If `None`, than log statements will be
                 sent to `sys.stderr`, often the console
+            maxqueue : int (default `None`)
+                If set, records are buffered, at most `maxqueue` of them, and
+                written by a background thread, so a slow reader of the
+                stream does not stall logging until the buffer is full
+            overflow : str (default 'block')
+                Only used if `maxqueue` is set. What to do with a new record
+                when the buffer is full: 'block' waits for room,
+                'drop-oldest' drops the oldest buffered record,
+                'drop-below-level' drops the new record if it is below
+                `overflowlevel` and waits otherwise, 'spill-to-file' appends
+                the new record to `spillpath`. See `stats` for the number of
+                records dropped and spilled
+            overflowlevel : str (default 'warning')
+                Only used by 'drop-below-level'
+            spillpath : str (default `None`)
+                Only used by 'spill-to-file', where it is required
         """
         log_controls = self._log_controls('console', logname, loglevel,
                                           logformat, dateformat)
-        log_handler = logging.StreamHandler(stream=None)
+        log_handler = _stream_handler(None, maxqueue, overflow, overflowlevel,
+                                      spillpath)
 
         self._add_logger(log_handler, log_controls)
 
     def add_filelogger(self, logpath, appendtime=True, logname=None,
                        loglevel=None, logformat=None, dateformat=None,
-                       encoding='utf-8', mode='a', delay=False):
+                       encoding='utf-8', mode='a', delay=False,
+                       buffered=False, buffersize=65536, flushinterval=1.0,
+                       flushlevel='error', maxbytes=None, rotateinterval=None,
+                       backupcount=None, compress=None, structured=False,
+                       backend='stream', segmentsize=16777216,
+                       compressoutput=None):
         """ Add a file logger
 
         Create a log file `logpath`. Path names are considered. If only a
@@ -253,9 +570,11 @@ class Easylog:
                 The log level of the handler. Lowercase names of `logging` log
                 levels i.e. 'info', 'critical', etc. If `None, it is set to
                 the global log level. See `Easylog.globallevel`
-            logformat : str (default `None`)
+            logformat : str or sequence of str (default `None`)
                 The log format for the handler. The same format as defined in
-                Python's `logging` module. If `None`, sets internal defaults
+                Python's `logging` module. If a sequence, the names of the
+                fields of structured JSON output. If `None`, sets internal
+                defaults
             dateformat : str (default `None`)
                 The date format for the handler. The same as used in the
                 `datetime` module. If `None`, sets internal defaults
@@ -269,19 +588,260 @@ class Easylog:
                 Delay the opening and writing of the file. The default `False`
                 is recommended for most cases. This parameter is the same as
                 `logging.FileHandler`
+            buffered : bool (default `False`)
+                If `True`, formatted records are collected in memory and
+                written to the file in large chunks. See `buffersize`,
+                `flushinterval` and `flushlevel` for when chunks are written
+            buffersize : int (default 65536)
+                Only used if `buffered` is `True`. Number of characters to
+                collect before writing them to the file
+            flushinterval : float (default 1.0)
+                Only used if `buffered` is `True`. Maximum number of seconds a
+                record waits in memory before it is written. If `None`,
+                records are only written by size or level, or on `close`
+            flushlevel : str (default 'error')
+                Only used if `buffered` is `True`. Records at or above this
+                log level are written to the file immediately, along with
+                everything buffered before them
+            maxbytes : int (default `None`)
+                Rotate the log file before it would hold more than this many
+                bytes. If `None`, the file is not rotated by size
+            rotateinterval : float (default `None`)
+                Rotate the log file after this many seconds. If `None`, the
+                file is not rotated by time
+            backupcount : int (default `None`)
+                Number of rotated files to keep, the oldest are removed. If
+                `None`, all rotated files are kept
+            compress : str (default `None`)
+                Compress rotated files on a background thread. One of 'gzip',
+                'xz' or `None`
+            structured : bool (default `False`)
+                If `True`, each record is written as one JSON object per line,
+                with the fields 'time', 'name', 'level' and 'message' unless
+                `logformat` names others. A str `logformat` raises
+                `ValueError`
+            backend : str (default 'stream')
+                How the file is written. 'stream' uses a regular file stream.
+                'mmap' copies records into a memory-mapped file that grows by
+                `segmentsize` bytes at a time, with no system call per record,
+                and truncates the file to its real length on `close`. Until
+                then the end of the file is padded with NUL bytes. The 'mmap'
+                backend cannot be combined with `buffered`, rotation or
+                `delay`
+            segmentsize : int (default 16777216)
+                Only used if `backend` is 'mmap'. Number of bytes the file
+                grows by whenever it is full
+            compressoutput : str (default `None`)
+                Compress the file as it is written, with 'gzip' or 'xz' on a
+                background thread. The extension '.gz' or '.xz' is added to
+                `logpath` if missing. Records are buffered the same as with
+                `buffered`, and every write is a complete compressed frame, so
+                the file stays readable after a crash. Cannot be combined
+                with the 'mmap' `backend`, rotation or `delay`
+
+            Rotated files are named after `logpath` with the datetime UTC
+            string of the rotation appended with a hyphen, the same as
+            `appendtime`, and a counter e.g. 'app-20200101T120000Z.000.log'.
+            The counter only goes above 000 for files rotated within the
+            same second
         """
+        basepath = logpath
+
         if appendtime is True:
             logpath = _append_time(logpath)
 
         log_controls = self._log_controls('file', logname, loglevel,
-                                          logformat, dateformat)
-        log_handler = logging.FileHandler(logpath, mode, encoding, delay)
+                                          logformat, dateformat, structured)
+
+        rotated = (maxbytes is not None or rotateinterval is not None or
+                   backupcount is not None or compress is not None)
+
+        if backend not in ('stream', 'mmap'):
+            raise ValueError("'backend' must be one of: 'stream', 'mmap'")
+
+        if compressoutput is not None:
+            if backend == 'mmap' or rotated or delay is True:
+                errmsg = ("'compressoutput' cannot be combined with the "
+                          "'mmap' backend, rotation or 'delay'")
+                raise ValueError(errmsg)
+
+            extension = _COMPRESSED_EXTENSIONS.get(compressoutput, '')
+
+            if not logpath.endswith(extension):
+                logpath += extension
+
+            log_handler = CompressedStreamHandler(
+                logpath, compressoutput, mode, encoding,
+                buffersize=buffersize, flushinterval=flushinterval,
+                flushlevel=_string2loglevel(flushlevel))
+        elif backend == 'mmap':
+            if buffered is True or rotated or delay is True:
+                errmsg = ("The 'mmap' backend cannot be combined with "
+                          "'buffered', rotation or 'delay'")
+                raise ValueError(errmsg)
+
+            log_handler = MmapFileHandler(logpath, mode, encoding,
+                                          segmentsize=segmentsize)
+        elif rotated:
+            if buffered is False:
+                buffersize = 0
+                flushinterval = None
+
+            log_handler = RotatingFileHandler(
+                logpath, mode, encoding, delay, buffersize=buffersize,
+                flushinterval=flushinterval,
+                flushlevel=_string2loglevel(flushlevel), maxbytes=maxbytes,
+                rotateinterval=rotateinterval, backupcount=backupcount,
+                compress=compress)
+            log_handler.namer = _rotation_namer(basepath)
+        elif buffered is True:
+            log_handler = BufferedFileHandler(
+                logpath, mode, encoding, delay, buffersize=buffersize,
+                flushinterval=flushinterval,
+                flushlevel=_string2loglevel(flushlevel))
+        else:
+            log_handler = logging.FileHandler(logpath, mode, encoding, delay)
 
         self._logfile.append({'logname': log_controls['logname'],
                               'filename': logpath})
 
         self._add_logger(log_handler, log_controls)
 
+    def add_networklogger(self, host, port, protocol='tcp', path='/',
+                          logname=None, loglevel=None, logformat=None,
+                          dateformat=None, structured=False, batchsize=100,
+                          linger=1.0, spillpath=None, maxbackoff=30.0):
+        """ Add a network logger
+
+        Sends records in batches to a collector, over one persistent TCP
+        connection or as HTTP POST requests on one persistent connection.
+        Sending happens on a background thread. While the collector cannot
+        be reached, batches are written to `spillpath` and sent once it is
+        back
+
+        Creates a `easylog.handlers.NetworkHandler` internally
+
+        Arguements:
+            host : str
+                Host name or address of the collector
+            port : int
+                Port of the collector
+            protocol : str (default 'tcp')
+                'tcp' sends newline separated records. 'http' posts each batch
+                of newline separated records to `path`
+            path : str (default '/')
+                Only used by 'http'. The path records are posted to
+            logname : str (default `None`)
+                The name of the handler. If `None`, a name is automatically
+                assigned as `network`, plus a counter e.g. `network0`
+            loglevel : str (default `None`)
+                The log level of the handler. Lowercase names of `logging` log
+                levels i.e. 'info', 'critical', etc. If `None, it is set to
+                the global log level. See `Easylog.globallevel`
+            logformat : str or sequence of str (default `None`)
+                The log format for the handler. The same as `add_filelogger`
+            dateformat : str (default `None`)
+                The date format for the handler. If `None`, sets internal
+                defaults
+            structured : bool (default `False`)
+                If `True`, each record is sent as one JSON object per line.
+                The same as `add_filelogger`
+            batchsize : int (default 100)
+                Number of records sent at most per batch
+            linger : float (default 1.0)
+                Longest time in seconds a record waits before it is sent
+            spillpath : str (default `None`)
+                File for batches that could not be sent. If `None`, they are
+                dropped. See `stats` for the number dropped and spilled
+            maxbackoff : float (default 30.0)
+                Longest delay in seconds between attempts to reconnect
+        """
+        log_controls = self._log_controls('network', logname, loglevel,
+                                          logformat, dateformat, structured)
+        log_handler = NetworkHandler(host, port, protocol, path,
+                                     batchsize=batchsize, linger=linger,
+                                     spillpath=spillpath,
+                                     maxbackoff=maxbackoff)
+
+        self._add_logger(log_handler, log_controls)
+
+    def add_memorylogger(self, target, capacity=1000, appendtime=True,
+                         logname=None, loglevel='debug', flushlevel='error',
+                         logformat=None, dateformat=None, encoding='utf-8'):
+        """ Add a memory logger
+
+        Keeps the last `capacity` records in memory, unformatted. They are
+        only formatted and written to `target` when a record at or above
+        `flushlevel` arrives, or when `dump_memorylogger` is called. This
+        gives full debug context around errors without writing every debug
+        record
+
+        Creates a `easylog.handlers.RingBufferHandler` internally
+
+        Arguements:
+            target : str or stream
+                Where records are written. A str is a log file path, handled
+                the same as `add_filelogger` and only created when records are
+                first written. Anything else is a stream, the same as
+                `add_streamlogger`
+            capacity : int (default 1000)
+                Number of records kept in memory
+            appendtime : bool (default `True`)
+                Only used if `target` is a path. The same as `add_filelogger`
+            logname : str (default `None`)
+                The name of the handler. If `None`, a name is automatically
+                assigned as `memory`, plus a counter e.g. `memory0`
+            loglevel : str (default 'debug')
+                The lowest log level kept in memory. Lowercase names of
+                `logging` log levels i.e. 'info', 'critical', etc. If `None`,
+                it is set to the global log level
+            flushlevel : str (default 'error')
+                Records at or above this log level write out the records in
+                memory, followed by themselves
+            logformat : str or sequence of str (default `None`)
+                The log format of the written records. The same as
+                `add_filelogger`. If `None`, sets internal defaults
+            dateformat : str (default `None`)
+                The date format of the written records. If `None`, sets
+                internal defaults
+            encoding : str (default 'utf-8')
+                Only used if `target` is a path. The encoding of the file
+        """
+        log_controls = self._log_controls('memory', logname, loglevel,
+                                          logformat, dateformat)
+
+        if isinstance(target, str):
+            if appendtime is True:
+                target = _append_time(target)
+
+            target_handler = logging.FileHandler(target, 'a', encoding,
+                                                 delay=True)
+
+            self._logfile.append({'logname': log_controls['logname'],
+                                  'filename': target})
+        else:
+            target_handler = logging.StreamHandler(stream=target)
+
+        log_handler = RingBufferHandler(capacity, target_handler,
+                                        _string2loglevel(flushlevel))
+
+        self._add_logger(log_handler, log_controls)
+
+    def dump_memorylogger(self, handlername):
+        """Write out the records held by a memory logger
+
+        Arguements:
+            handlername : str
+                The name of a handler created by `add_memorylogger`
+        """
+        handler_rec = self._get_handler_record(handlername)
+
+        if handler_rec['loggertype'] != 'memory':
+            errmsg = "Handler '{0}' is not a memory logger"
+            raise ValueError(errmsg.format(handlername))
+
+        handler_rec['handler'].dump()
+
     def set_logformat(self, handlername, fmt, dateformat=None):
         """Change a handler's log format
 
@@ -291,41 +851,298 @@ class Easylog:
             handlername : str
                 The name of the handler. See the property `handlernames` to
                 find out the names of created handlers
-            fmt : str
+            fmt : str or sequence of str
                 The new log format for the handler. The same format as defined
-                in Python's `logging` module
+                in Python's `logging` module. If a sequence, the names of the
+                fields of structured JSON output
             dateformat : str (default `None`)
                 The new date format for the handler. The same as used in the
                 `datetime` module. If `None` than the date format is not
                 changed
         """
-        if self._handlers:
+        handler_rec = self._get_handler_record(handlername)
+
+        if dateformat is None:
+            dateformat = handler_rec['dateformat']
+
+        fmt = _build_formatter(fmt, dateformat)
+        handler_rec['handler'].setFormatter(fmt)
+        handler_rec['dateformat'] = dateformat
+
+        self._build_leveltable()
+
+    def set_loglevel(self, handlername, loglevel):
+        """Change a handler's log level
+
+        Arguements:
+            handlername : str
+                The name of the handler. See the property `handlernames` to
+                find out the names of created handlers
+            loglevel : str
+                The new log level for the handler. Lowercase names of
+                `logging` log levels i.e. 'info', 'critical', etc.
+        """
+        handler_rec = self._get_handler_record(handlername)
+        loglevel = _string2loglevel(loglevel)
+
+        with self._statslock:
+            self._fold_filtered()
+
+            handler_rec['handler'].setLevel(loglevel)
+            handler_rec['loglevel'] = loglevel
+
+            self._build_leveltable()
+
+    def stats(self, reset=False):
+        """Runtime statistics for each handler
+
+        Counts records emitted, records filtered by level, bytes written
+        and errors, along with the total and longest time spent in `emit` and
+        in formatting. Times are in seconds. Handlers with a `maxqueue`, and
+        network loggers, also count the records they dropped and spilled.
+        Counting is always on, and taking a snapshot only copies the counters
+
+        Arguements:
+            reset : bool (default `False`)
+                If `True`, counters are set back to zero after the snapshot
+
+        Returns:
+            dict of handler name to a dict of counters
+        """
+        result = dict()
+
+        with self._statslock:
+            self._fold_filtered()
+
+            for a_handler in self._handlers:
+                result[a_handler['name']] = a_handler['stats'].snapshot()
+
+                if isinstance(a_handler['handler'],
+                              (BoundedStreamHandler, NetworkHandler)):
+                    result[a_handler['name']].update(
+                        a_handler['handler'].overflow_stats())
+
+                if reset is True:
+                    a_handler['stats'].reset()
+
+        return result
+
+    def _fold_filtered(self):
+        # Each thread counts the records it logged per level in counts of
+        # its own, so counting takes no lock and loses nothing. They are only
+        # added to the handlers' stats when those are read or the handlers
+        # change, as the difference from what was added before
+        for a_thread, counts, folded in list(self._filtercounts):
+            finished = not a_thread.is_alive()
+
+            for a_level, a_count in counts.items():
+                if a_count != folded[a_level]:
+                    for a_stats in self._filtertable[a_level]:
+                        a_stats.filtered += a_count - folded[a_level]
+
+                    folded[a_level] = a_count
+
+            if finished:
+                self._filtercounts.remove((a_thread, counts, folded))
+
+    def _thread_filtercounts(self):
+        counts = dict.fromkeys(_LOG_LEVELS, 0)
+        self._local.filtered = counts
+        self._filtercounts.append((threading.current_thread(), counts,
+                                   dict.fromkeys(_LOG_LEVELS, 0)))
+
+        return counts
+
+    def set_logpolicy(self, loglevel, sample=None, ratelimit=None,
+                      burst=None, suppressrepeats=None):
+        """Sample, rate limit or collapse messages of one log level
+
+        Policies are checked before a record is created, so dropped messages
+        cost no formatting or I/O in any handler. Calling this again for the
+        same log level replaces its policy, and calling it with no policies
+        removes it
+
+        Example:
+            Collapse identical warnings within 5 seconds, and allow at most
+            100 warnings per second::
+
+                >>> mylogger.set_logpolicy('warning', suppressrepeats=5,
+                ...                        ratelimit=100)
+
+        Arguements:
+            loglevel : str
+                The log level the policy applies to. Lowercase names of
+                `logging` log levels i.e. 'info', 'critical', etc.
+            sample : int (default `None`)
+                Keep one in every `sample` messages
+            ratelimit : float (default `None`)
+                Messages per second allowed on average
+            burst : int (default `None`)
+                Messages allowed at once before `ratelimit` applies. If
+                `None`, the same as `ratelimit`
+            suppressrepeats : float (default `None`)
+                Window in seconds in which identical messages are collapsed
+                into one line with a repeat count. The count is logged before
+                the next message of this log level once the window has passed,
+                or by `close`
+
+        Returns:
+            The `easylog.policies.LogPolicy`, which counts dropped messages,
+            or `None` if the policy was removed
+        """
+        loglevel = _string2loglevel(loglevel)
+
+        if (sample is None and ratelimit is None and burst is None and
+                suppressrepeats is None):
+            self._policies.pop(loglevel, None)
+
+            return None
+
+        policy = LogPolicy(sample=sample, ratelimit=ratelimit, burst=burst,
+                           suppressrepeats=suppressrepeats)
+        self._policies[loglevel] = policy
+
+        return policy
+
+    def bind(self, **context):
+        """A logger that adds `context` to every message
+
+        Returns a `BoundLogger` sharing this instance's handlers, level and
+        policies. `context` is rendered once, here, into a prefix for text
+        output e.g. 'request_id=abc user=bob - ' and into extra fields for
+        structured JSON output, instead of on every call
+
+        Example:
+            >>> request_logger = mylogger.bind(request_id='abc', user='bob')
+            >>> request_logger.log_info('Request finished')
+            INFO - request_id=abc user=bob - Request finished
+
+        Arguements:
+            **context
+                Names and values to add to every message
+        """
+        return BoundLogger(self, context)
+
+    def _get_handler_record(self, handlername):
+        if not self._handlers:
             errmsg = "No Logging Handlers have been defined"
             raise NoDefinedHandlersError(errmsg)
+
+        handler_records = [a_handler for a_handler in self._handlers
+                           if a_handler['name'] == handlername]
+
+        if not handler_records:
+            errmsg = "No handler of the name '{0}' was found"
+            errmsg = errmsg.format(handlername)
+
+            raise NoHandlersFoundError(errmsg)
+
+        return handler_records[0]
+
+    def _build_leveltable(self):
+        # For each log level, the stats of the handlers that filter it out.
+        # Levels below the lowest handler level are rejected by the log_*
+        # methods with a single comparison against `_minlevel`, before any
+        # record is built
+        self._filtertable = {
+            a_level: tuple(a_handler['stats'] for a_handler in self._handlers
+                           if a_handler['loglevel'] > a_level)
+            for a_level in _LOG_LEVELS
+        }
+
+        if self._handlers:
+            self._minlevel = min(a_handler['loglevel']
+                                 for a_handler in self._handlers)
         else:
-            handler_records = [a_handler for a_handler in self._handlers
-                               if a_handler['name'] == handlername]
+            self._minlevel = logging.CRITICAL + 1
 
-            if handler_records:
-                errmsg = "No handler of the name '{0}' was found"
-                errmsg = errmsg.format(handlername)
+    def _log(self, level, msg, args, kwargs, prefix='', extra=None,
+             exc_info=None, collapse=False):
+        if self._filtertable[level]:
+            counts = self._local.__dict__.get('filtered')
 
-                raise NoHandlersFoundError(errmsg)
-            else:
-                handler_rec = handler_records[0]
+            if counts is None:
+                counts = self._thread_filtercounts()
+
+            counts[level] += 1
+
+        exc_info = _exc_info(exc_info)
+        suffix = ''
+
+        if exc_info is not None and collapse is True:
+            suffix = self._collapse_traceback(exc_info)
 
-                if dateformat is None:
-                    dateformat = handler_rec['dateformat']
+            if suffix:
+                exc_info = None
 
-                fmt = logging.Formatter(fmt, dateformat)
-                handler_records['handler'].setFormatter(fmt)
+        if args or kwargs or callable(msg):
+            msg = _LazyMessage(msg, args, kwargs, prefix, suffix)
+        elif prefix or suffix:
+            msg = prefix + str(msg) + suffix
+
+        if suffix:
+            # Repeats of a collapsed traceback within the window are only
+            # counted, the same as `set_logpolicy` with `suppressrepeats`
+            allowed, summaries = self._tracebackpolicy.check(msg)
+
+            for a_summary in summaries:
+                self._logger.log(level, a_summary, extra=extra)
+
+            if not allowed:
+                return
+
+        if self._policies:
+            policy = self._policies.get(level)
+
+            if policy is not None:
+                allowed, summaries = policy.check(msg)
+
+                for a_summary in summaries:
+                    self._logger.log(level, a_summary, extra=extra)
+
+                if not allowed:
+                    return
+
+        self._logger.log(level, msg, exc_info=exc_info, extra=extra)
+
+    async def _alog(self, level, msg, args, kwargs, prefix='', extra=None,
+                    exc_info=None):
+        # The exception being handled is only known on the calling thread
+        exc_info = _exc_info(exc_info)
+
+        if self._queuelistener is not None or self._threadbuffer is not None:
+            self._log(level, msg, args, kwargs, prefix, extra, exc_info)
+        else:
+            await self._run_in_executor(self._log, level, msg, args, kwargs,
+                                        prefix, extra, exc_info)
+
+    def _collapse_traceback(self, exc_info):
+        """The line that replaces a traceback seen before, or ''"""
+        key = traceback_key(exc_info)
+
+        if key is None:
+            return ''
+
+        with self._tracebacklock:
+            if key not in self._tracebacks:
+                if len(self._tracebacks) >= _TRACEBACK_COUNTS_SIZE:
+                    self._tracebacks.clear()
+
+                self._tracebacks.add(key)
+
+                return ''
+
+        exception = traceback.format_exception_only(exc_info[0], exc_info[1])
+        exception = ''.join(exception).rstrip('\n')
+
+        return '\n{0} (traceback logged before)'.format(exception)
 
     def _get_handler_names(self):
         result = [a_logger['name'] for a_logger in self._handlers]
 
         return result
 
-    def log_critical(self, msg):
+    def log_critical(self, msg, *args, exc_info=None, **kwargs):
         """Log a message as critical
 
         Critical is the most severe log message, often used when an error is
@@ -334,13 +1151,22 @@ class Easylog:
         Handlers set to 'critical' log level will log the following messages:
         'critical' only
 
-        Arguments:
-            msg : str
-                The message to be logged
+        Arguements:
+            msg : str or callable
+                The message to be logged. If `args` or `kwargs` are given,
+                `msg` is a template filled in with `str.format`. A callable
+                is called with no arguments to build the message. Either way,
+                the message is only built if a handler will emit it
+            *args, **kwargs
+                Values for the `msg` template
+            exc_info : bool, exception or tuple (default `None`)
+                Add a traceback to the message. `True` uses the exception
+                being handled. The same as in `logging`
         """
-        self._logger.critical(msg)
+        if logging.CRITICAL >= self._minlevel:
+            self._log(logging.CRITICAL, msg, args, kwargs, exc_info=exc_info)
 
-    def log_error(self, msg):
+    def log_error(self, msg, *args, exc_info=None, **kwargs):
         """Log a message as error
 
         Error is the second most severe log message, often used when an
@@ -351,13 +1177,22 @@ class Easylog:
         Handlers set to 'error' log level will log the following messages:
         'error', 'critical'
 
-        Arguments:
-            msg : str
-                The message to be logged
+        Arguements:
+            msg : str or callable
+                The message to be logged. If `args` or `kwargs` are given,
+                `msg` is a template filled in with `str.format`. A callable
+                is called with no arguments to build the message. Either way,
+                the message is only built if a handler will emit it
+            *args, **kwargs
+                Values for the `msg` template
+            exc_info : bool, exception or tuple (default `None`)
+                Add a traceback to the message. `True` uses the exception
+                being handled. The same as in `logging`
         """
-        self._logger.error(msg)
+        if logging.ERROR >= self._minlevel:
+            self._log(logging.ERROR, msg, args, kwargs, exc_info=exc_info)
 
-    def log_warning(self, msg):
+    def log_warning(self, msg, *args, exc_info=None, **kwargs):
         """Log a message as warning
 
         Warning is the third most severe log message, often used when a warning
@@ -368,13 +1203,22 @@ class Easylog:
         Handlers set to 'warning' log level will log the following messages:
         'warning', 'error', 'critical'
 
-        Arguments:
-            msg : str
-                The message to be logged
+        Arguements:
+            msg : str or callable
+                The message to be logged. If `args` or `kwargs` are given,
+                `msg` is a template filled in with `str.format`. A callable
+                is called with no arguments to build the message. Either way,
+                the message is only built if a handler will emit it
+            *args, **kwargs
+                Values for the `msg` template
+            exc_info : bool, exception or tuple (default `None`)
+                Add a traceback to the message. `True` uses the exception
+                being handled. The same as in `logging`
         """
-        self._logger.warning(msg)
+        if logging.WARNING >= self._minlevel:
+            self._log(logging.WARNING, msg, args, kwargs, exc_info=exc_info)
 
-    def log_info(self, msg):
+    def log_info(self, msg, *args, exc_info=None, **kwargs):
         """Log a message as info
 
         Info is the basic type of log messages e.g. logging useful information
@@ -384,13 +1228,22 @@ class Easylog:
         Handlers set to 'info' log level will log the following messages:
         'info', 'warning', 'error', 'critical'
 
-        Arguments:
-            msg : str
-                The message to be logged
+        Arguements:
+            msg : str or callable
+                The message to be logged. If `args` or `kwargs` are given,
+                `msg` is a template filled in with `str.format`. A callable
+                is called with no arguments to build the message. Either way,
+                the message is only built if a handler will emit it
+            *args, **kwargs
+                Values for the `msg` template
+            exc_info : bool, exception or tuple (default `None`)
+                Add a traceback to the message. `True` uses the exception
+                being handled. The same as in `logging`
         """
-        self._logger.info(msg)
+        if logging.INFO >= self._minlevel:
+            self._log(logging.INFO, msg, args, kwargs, exc_info=exc_info)
 
-    def log_debug(self, msg):
+    def log_debug(self, msg, *args, exc_info=None, **kwargs):
         """Log a message as debug
 
         Debug is typically used when the program is set in some kind of
@@ -401,11 +1254,298 @@ class Easylog:
         Handlers set to 'debug' log level will log the following messages:
         'debug', 'info', 'warning', 'error', 'critical'
 
-        Arguments:
-            msg : str
-                The message to be logged
+        Arguements:
+            msg : str or callable
+                The message to be logged. If `args` or `kwargs` are given,
+                `msg` is a template filled in with `str.format`. A callable
+                is called with no arguments to build the message. Either way,
+                the message is only built if a handler will emit it
+            *args, **kwargs
+                Values for the `msg` template
+            exc_info : bool, exception or tuple (default `None`)
+                Add a traceback to the message. `True` uses the exception
+                being handled. The same as in `logging`
+        """
+        if logging.DEBUG >= self._minlevel:
+            self._log(logging.DEBUG, msg, args, kwargs, exc_info=exc_info)
+
+    def log_exception(self, msg, *args, collapse=False, **kwargs):
+        """Log a message as error, with the traceback of the exception being
+        handled
+
+        Call from an `except` block. The traceback is rendered the same as
+        `logging` does, but the stack part of it is cached by code location
+        and exception type, so logging the same exception again only renders
+        the final exception line
+
+        Arguements:
+            msg : str or callable
+                The message to be logged. The same as `log_error`
+            *args, **kwargs
+                Values for the `msg` template
+            collapse : bool (default `False`)
+                If `True`, a traceback identical to one logged before by this
+                `Easylog` is replaced by the final exception line. Further
+                identical messages within 60 seconds of that are dropped and
+                counted. The count is logged as one line before the next
+                collapsed traceback once the window has passed, or by
+                `close`, the same as `set_logpolicy` with `suppressrepeats`
+        """
+        if logging.ERROR >= self._minlevel:
+            self._log(logging.ERROR, msg, args, kwargs, exc_info=True,
+                      collapse=collapse)
+
+    async def alog_critical(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as critical, without blocking the event loop
+
+        Arguments are the same as `log_critical`. If `Easylog` is queued or
+        thread buffered, the record is handed to the background writer and
+        this returns immediately. Otherwise the record is handled on a worker
+        thread, and this returns once it is written
+        """
+        if logging.CRITICAL >= self._minlevel:
+            await self._alog(logging.CRITICAL, msg, args, kwargs,
+                             exc_info=exc_info)
+
+    async def alog_error(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as error, without blocking the event loop
+
+        Arguments are the same as `log_error`. If `Easylog` is queued or
+        thread buffered, the record is handed to the background writer and
+        this returns immediately. Otherwise the record is handled on a worker
+        thread, and this returns once it is written
+        """
+        if logging.ERROR >= self._minlevel:
+            await self._alog(logging.ERROR, msg, args, kwargs,
+                             exc_info=exc_info)
+
+    async def alog_warning(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as warning, without blocking the event loop
+
+        Arguments are the same as `log_warning`. If `Easylog` is queued or
+        thread buffered, the record is handed to the background writer and
+        this returns immediately. Otherwise the record is handled on a worker
+        thread, and this returns once it is written
         """
-        self._logger.debug(msg)
+        if logging.WARNING >= self._minlevel:
+            await self._alog(logging.WARNING, msg, args, kwargs,
+                             exc_info=exc_info)
+
+    async def alog_info(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as info, without blocking the event loop
+
+        Arguments are the same as `log_info`. If `Easylog` is queued or
+        thread buffered, the record is handed to the background writer and
+        this returns immediately. Otherwise the record is handled on a worker
+        thread, and this returns once it is written
+        """
+        if logging.INFO >= self._minlevel:
+            await self._alog(logging.INFO, msg, args, kwargs,
+                             exc_info=exc_info)
+
+    async def alog_debug(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as debug, without blocking the event loop
+
+        Arguments are the same as `log_debug`. If `Easylog` is queued or
+        thread buffered, the record is handed to the background writer and
+        this returns immediately. Otherwise the record is handled on a worker
+        thread, and this returns once it is written
+        """
+        if logging.DEBUG >= self._minlevel:
+            await self._alog(logging.DEBUG, msg, args, kwargs,
+                             exc_info=exc_info)
+
+
+class BoundLogger:
+    """A logger with context fields, created by `Easylog.bind`
+
+    Has the same log_* and alog_* methods as `Easylog`, and logs through the
+    `Easylog` that created it. The context is rendered once, when the logger
+    is bound
+
+    Attributes:
+        context : dict
+            The bound names and values
+    """
+    __slots__ = ('context', '_parent', '_prefix', '_extra')
+
+    def __init__(self, parent, context):
+        self.context = dict(context)
+        self._parent = parent
+        self._prefix = ' '.join('{0}={1}'.format(key, value)
+                                for key, value in self.context.items())
+
+        if self._prefix:
+            self._prefix += ' - '
+
+        self._extra = {'easylog_prefix': self._prefix,
+                       'easylog_fields': encode_fields(self.context)}
+
+    def bind(self, **context):
+        """A logger with this logger's context plus `context`"""
+        merged = dict(self.context)
+        merged.update(context)
+
+        return BoundLogger(self._parent, merged)
+
+    def log_critical(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as critical. See `Easylog.log_critical`"""
+        parent = self._parent
+
+        if logging.CRITICAL >= parent._minlevel:
+            parent._log(logging.CRITICAL, msg, args, kwargs, self._prefix,
+                        self._extra, exc_info)
+
+    def log_error(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as error. See `Easylog.log_error`"""
+        parent = self._parent
+
+        if logging.ERROR >= parent._minlevel:
+            parent._log(logging.ERROR, msg, args, kwargs, self._prefix,
+                        self._extra, exc_info)
+
+    def log_warning(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as warning. See `Easylog.log_warning`"""
+        parent = self._parent
+
+        if logging.WARNING >= parent._minlevel:
+            parent._log(logging.WARNING, msg, args, kwargs, self._prefix,
+                        self._extra, exc_info)
+
+    def log_info(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as info. See `Easylog.log_info`"""
+        parent = self._parent
+
+        if logging.INFO >= parent._minlevel:
+            parent._log(logging.INFO, msg, args, kwargs, self._prefix,
+                        self._extra, exc_info)
+
+    def log_debug(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as debug. See `Easylog.log_debug`"""
+        parent = self._parent
+
+        if logging.DEBUG >= parent._minlevel:
+            parent._log(logging.DEBUG, msg, args, kwargs, self._prefix,
+                        self._extra, exc_info)
+
+    def log_exception(self, msg, *args, collapse=False, **kwargs):
+        """Log a message as error, with the traceback of the exception being
+        handled. See `Easylog.log_exception`
+        """
+        parent = self._parent
+
+        if logging.ERROR >= parent._minlevel:
+            parent._log(logging.ERROR, msg, args, kwargs, self._prefix,
+                        self._extra, True, collapse)
+
+    async def alog_critical(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as critical, without blocking the event loop. See
+        `Easylog.alog_critical`
+        """
+        parent = self._parent
+
+        if logging.CRITICAL >= parent._minlevel:
+            await parent._alog(logging.CRITICAL, msg, args, kwargs,
+                               self._prefix, self._extra, exc_info)
+
+    async def alog_error(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as error, without blocking the event loop. See
+        `Easylog.alog_error`
+        """
+        parent = self._parent
+
+        if logging.ERROR >= parent._minlevel:
+            await parent._alog(logging.ERROR, msg, args, kwargs, self._prefix,
+                               self._extra, exc_info)
+
+    async def alog_warning(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as warning, without blocking the event loop. See
+        `Easylog.alog_warning`
+        """
+        parent = self._parent
+
+        if logging.WARNING >= parent._minlevel:
+            await parent._alog(logging.WARNING, msg, args, kwargs,
+                               self._prefix, self._extra, exc_info)
+
+    async def alog_info(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as info, without blocking the event loop. See
+        `Easylog.alog_info`
+        """
+        parent = self._parent
+
+        if logging.INFO >= parent._minlevel:
+            await parent._alog(logging.INFO, msg, args, kwargs, self._prefix,
+                               self._extra, exc_info)
+
+    async def alog_debug(self, msg, *args, exc_info=None, **kwargs):
+        """Log a message as debug, without blocking the event loop. See
+        `Easylog.alog_debug`
+        """
+        parent = self._parent
+
+        if logging.DEBUG >= parent._minlevel:
+            await parent._alog(logging.DEBUG, msg, args, kwargs, self._prefix,
+                               self._extra, exc_info)
+
+
+class _LazyMessage:
+    """A log message that is only built when it is first rendered
+
+    `logging` calls `str` on a record's message only when a handler formats
+    the record, so the template is filled in (or the callable called) once,
+    and only if the record is actually emitted
+    """
+    __slots__ = ('_msg', '_args', '_kwargs', '_prefix', '_suffix',
+                 '_rendered')
+
+    def __init__(self, msg, args, kwargs, prefix='', suffix=''):
+        self._msg = msg
+        self._args = args
+        self._kwargs = kwargs
+        self._prefix = prefix
+        self._suffix = suffix
+        self._rendered = None
+
+    def __str__(self):
+        if self._rendered is None:
+            if callable(self._msg):
+                rendered = str(self._msg())
+            else:
+                rendered = str(self._msg).format(*self._args, **self._kwargs)
+
+            self._rendered = self._prefix + rendered + self._suffix
+
+        return self._rendered
+
+
+# Tracebacks seen by `Easylog.log_exception` with `collapse`, at most
+_TRACEBACK_COUNTS_SIZE = 1024
+
+# Seconds in which repeats of a collapsed traceback are counted, not logged
+_COLLAPSE_WINDOW = 60
+
+_COMPRESSED_EXTENSIONS = {'gzip': '.gz', 'xz': '.xz'}
+
+_LOG_LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR,
+               logging.CRITICAL)
+
+
+def _exc_info(exc_info):
+    """Normalise `exc_info` the same as `logging`, or `None`"""
+    if not exc_info:
+        return None
+
+    if isinstance(exc_info, BaseException):
+        return (type(exc_info), exc_info, exc_info.__traceback__)
+
+    if not isinstance(exc_info, tuple):
+        exc_info = sys.exc_info()
+
+    if exc_info[0] is None:
+        return None
+
+    return exc_info
 
 
 def _default_log_format(handlertype):
@@ -417,12 +1557,33 @@ def _default_log_format(handlertype):
         handler_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     elif handlertype == 'stream':
         handler_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    elif handlertype == 'memory':
+        handler_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    elif handlertype == 'network':
+        handler_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    elif handlertype == 'queue':
+        handler_format = '%(message)s'
     elif handlertype == 'module':
         handler_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
     return handler_format
 
 
+def _build_formatter(logformat, dateformat):
+    if isinstance(logformat, str):
+        return CachedTimeFormatter(logformat, dateformat)
+
+    return JsonFormatter(logformat, dateformat)
+
+
+def _stream_handler(stream, maxqueue, overflow, overflowlevel, spillpath):
+    if maxqueue is None:
+        return logging.StreamHandler(stream=stream)
+
+    return BoundedStreamHandler(stream, maxqueue, overflow,
+                                _string2loglevel(overflowlevel), spillpath)
+
+
 def _string2loglevel(loglevel):
     logging_object_level = None
 
@@ -446,9 +1607,10 @@ def _string2loglevel(loglevel):
     return logging_object_level
 
 
-def _logger_record(handler, name, loggertype, loglevel, dateformat):
+def _logger_record(handler, name, loggertype, loglevel, dateformat, stats):
         record = {'handler': handler, 'name': name, 'loggertype': loggertype,
-                  'loglevel': loglevel, 'dateformat': dateformat}
+                  'loglevel': loglevel, 'dateformat': dateformat,
+                  'stats': stats}
 
         return record
 
@@ -474,6 +1636,14 @@ def _append_time(thepath):
     return newpath
 
 
+def _rotation_namer(logpath):
+    """A `namer` naming rotated files after `logpath`, with the time"""
+    def namer(default_name):
+        return _append_time(logpath)
+
+    return namer
+
+
 class Error(Exception):
     """Base class for exceptions in Easylog"""
     pass
@@ -0,0 +1,237 @@
+import json
+import logging
+import time
+import traceback
+
+
+try:
+    from _json import encode_basestring as _encode_string
+except ImportError:
+    from json.encoder import py_encode_basestring as _encode_string
+
+try:
+    _ExceptionGroup = BaseExceptionGroup
+except NameError:
+    # Before Python 3.11, `isinstance` against an empty tuple is always False
+    _ExceptionGroup = ()
+
+
+DEFAULT_JSON_FIELDS = ('time', 'name', 'level', 'message')
+
+# Rendered tracebacks, without the final exception line, by `traceback_key`
+_traceback_cache = dict()
+_TRACEBACK_CACHE_SIZE = 1024
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """A `logging.Formatter` that renders each second's time only once
+
+    `formatTime` calls `strftime` once per second of `record.created` and
+    reuses the result for every other record in that second. Milliseconds are
+    still added per record when the default date format is used.
+    `formatException` reuses tracebacks rendered before, see
+    `format_exception`. Otherwise the same as `logging.Formatter`
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # (second, date format, rendered time), replaced as a whole so that
+        # threads sharing the formatter never see a mismatched entry
+        self._timecache = (None, None, None)
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, cached_datefmt, text = self._timecache
+
+        if second != cached_second or datefmt != cached_datefmt:
+            ct = self.converter(record.created)
+
+            if datefmt:
+                text = time.strftime(datefmt, ct)
+            else:
+                text = time.strftime(self.default_time_format, ct)
+
+            self._timecache = (second, datefmt, text)
+
+        if not datefmt and self.default_msec_format:
+            text = self.default_msec_format % (text, record.msecs)
+
+        return text
+
+    def formatException(self, ei):
+        return format_exception(ei)
+
+
+class JsonFormatter(CachedTimeFormatter):
+    """Format records as one JSON object per line
+
+    The field layout is compiled once, at construction: every field becomes a
+    pre-encoded key plus a function that returns the JSON encoded value.
+    Values that rarely change, such as the logger and level names and the
+    time within a second, are encoded once and cached. Strings are escaped
+    with the C accelerated encoder that `json` itself uses, without going
+    through `json.dumps`
+
+    Records logged through `Easylog.bind` also get the bound context as
+    fields, encoded once at bind time
+
+    Arguements:
+        fields : sequence of str (default `DEFAULT_JSON_FIELDS`)
+            Names of the fields to output, in order. 'time', 'name', 'level'
+            and 'message' are built in. Any other name is read from the
+            `logging.LogRecord` attribute of the same name e.g. 'lineno'
+        datefmt : str (default `None`)
+            Date format of the 'time' field. The same as `logging.Formatter`
+        static : dict (default `None`)
+            Fields with the same value on every record. They are encoded once
+            and appended after `fields`
+    """
+
+    def __init__(self, fields=None, datefmt=None, static=None):
+        super().__init__(datefmt=datefmt)
+
+        if fields is None:
+            fields = DEFAULT_JSON_FIELDS
+
+        self.fields = tuple(fields)
+        self.static = dict() if static is None else dict(static)
+
+        self._names = dict()
+        self._levels = dict()
+        self._encoded_time = (None, None)
+        self._layout = [(_encode_string(a_field) + ':',
+                         self._field_getter(a_field))
+                        for a_field in self.fields]
+        self._static = encode_fields(self.static)
+
+    def format(self, record):
+        result = '{' + ','.join([key + get(record)
+                                 for key, get in self._layout])
+        result += self._static
+        result += record.__dict__.get('easylog_fields', '')
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            result += ',"exc_info":' + _encode_string(record.exc_text)
+
+        return result + '}'
+
+    def _field_getter(self, field):
+        if field == 'time':
+            return self._get_time
+        elif field == 'name':
+            return self._get_name
+        elif field == 'level':
+            return self._get_level
+        elif field == 'message':
+            return self._get_message
+        else:
+            def get_attribute(record):
+                return json.dumps(getattr(record, field, None), default=str)
+
+            return get_attribute
+
+    def _get_time(self, record):
+        # The time only needs encoding when it changes, every second or, with
+        # milliseconds, every millisecond
+        text = self.formatTime(record, self.datefmt)
+        cached_text, encoded = self._encoded_time
+
+        if text != cached_text:
+            encoded = _encode_string(text)
+            self._encoded_time = (text, encoded)
+
+        return encoded
+
+    def _get_name(self, record):
+        try:
+            return self._names[record.name]
+        except KeyError:
+            encoded = self._names[record.name] = _encode_string(record.name)
+
+            return encoded
+
+    def _get_level(self, record):
+        try:
+            return self._levels[record.levelno]
+        except KeyError:
+            encoded = _encode_string(record.levelname)
+            self._levels[record.levelno] = encoded
+
+            return encoded
+
+    def _get_message(self, record):
+        message = record.getMessage()
+
+        # Loggers from `Easylog.bind` prefix the message with their context,
+        # which is already output as separate fields
+        prefix = record.__dict__.get('easylog_prefix')
+
+        if prefix and message.startswith(prefix):
+            message = message[len(prefix):]
+
+        return _encode_string(message)
+
+
+def encode_fields(fields):
+    """Encode a dict as JSON object members, each preceded by a comma"""
+    return ''.join(',' + _encode_string(str(key)) + ':' +
+                   json.dumps(value, default=str)
+                   for key, value in fields.items())
+
+
+def traceback_key(ei):
+    """What makes the traceback of `ei` unique, apart from the exception value
+
+    The exception type plus the code object, line and instruction of every
+    frame. `None` for chained exceptions, exception groups and exceptions
+    without a traceback, which are not cached
+    """
+    etype, value, tb = ei
+
+    if tb is None or isinstance(value, _ExceptionGroup):
+        return None
+
+    if value is not None and (value.__cause__ is not None or
+                              (value.__context__ is not None and
+                               not value.__suppress_context__)):
+        return None
+
+    frames = list()
+
+    while tb is not None:
+        frames.append((tb.tb_frame.f_code, tb.tb_lineno, tb.tb_lasti))
+        tb = tb.tb_next
+
+    return (etype, tuple(frames))
+
+
+def format_exception(ei):
+    """Render exception info `ei` the same as `logging.Formatter`
+
+    The stack part of the traceback, which needs source lines read and
+    formatted, is cached by `traceback_key`. Only the final exception line,
+    which holds the exception's value, is rendered every time
+    """
+    key = traceback_key(ei)
+
+    if key is None:
+        return ''.join(traceback.format_exception(*ei)).rstrip('\n')
+
+    stack = _traceback_cache.get(key)
+
+    if stack is None:
+        if len(_traceback_cache) >= _TRACEBACK_CACHE_SIZE:
+            _traceback_cache.clear()
+
+        stack = 'Traceback (most recent call last):\n'
+        stack += ''.join(traceback.format_tb(ei[2]))
+        _traceback_cache[key] = stack
+
+    text = stack + ''.join(traceback.format_exception_only(ei[0], ei[1]))
+
+    return text.rstrip('\n')
@@ -0,0 +1,1573 @@
+import collections
+import copy
+import gzip
+import heapq
+import http.client
+import io
+import itertools
+import locale
+import logging
+import logging.handlers
+import lzma
+import mmap
+import os
+import queue
+import select
+import shutil
+import socket
+import threading
+import time
+import traceback
+
+from easylog.formatters import format_exception
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """A file handler that writes formatted records in large chunks
+
+    Formatted records are collected in memory and written to the file stream
+    as a single chunk once the buffer is full, once the oldest buffered record
+    is older than `flushinterval` seconds, or as soon as a record at or above
+    `flushlevel` arrives. This replaces one write and flush per record with one
+    per chunk
+
+    Arguements:
+        filename : str
+            Filename of the log file. The same as `logging.FileHandler`
+        mode : str (default 'a')
+            The same as `logging.FileHandler`
+        encoding : str (default `None`)
+            The same as `logging.FileHandler`
+        delay : bool (default `False`)
+            The same as `logging.FileHandler`
+        buffersize : int (default 65536)
+            Number of characters to collect before writing them out
+        flushinterval : float (default 1.0)
+            Maximum number of seconds a record waits in the buffer. If `None`,
+            records are only written by size, level, `flush` or `close`
+        flushlevel : int (default `logging.ERROR`)
+            Records at or above this level flush the buffer immediately
+    """
+
+    def __init__(self, filename, mode='a', encoding=None, delay=False,
+                 buffersize=65536, flushinterval=1.0,
+                 flushlevel=logging.ERROR):
+        super().__init__(filename, mode, encoding, delay)
+
+        self.buffersize = buffersize
+        self.flushinterval = flushinterval
+        self.flushlevel = flushlevel
+
+        self._buffer = list()
+        self._buffered = 0
+        self._length = len
+        self._flusher = None
+        self._flush_scheduled = False
+
+        if flushinterval is not None:
+            self._flusher = _IntervalFlusher(self.flush, flushinterval)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+
+            self._buffer.append(msg)
+            self._buffered += self._length(msg)
+
+            if (self._buffered >= self.buffersize or
+                    record.levelno >= self.flushlevel):
+                self._write_buffer()
+                self.stream.flush()
+            elif not self._flush_scheduled and self._flusher is not None:
+                self._flusher.schedule()
+                self._flush_scheduled = True
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self._write_buffer()
+            super().flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            self._write_buffer()
+
+            if self._flusher is not None:
+                self._flusher.stop()
+
+            super().close()
+        finally:
+            self.release()
+
+    def _write_buffer(self):
+        if self._flush_scheduled:
+            self._flusher.cancel()
+            self._flush_scheduled = False
+
+        if not self._buffer:
+            return
+
+        if self.stream is None:
+            self.stream = self._open()
+
+        self.stream.write(''.join(self._buffer))
+
+        self._buffer.clear()
+        self._buffered = 0
+
+
+class _IntervalFlusher:
+    """Call `flush` `interval` seconds after `schedule`, on one thread
+
+    The thread is started by the first `schedule` and lives until `stop`,
+    waiting on a condition in between, instead of starting a
+    `threading.Timer` thread for every buffer. `flush` is called without the
+    condition held, so it may take the handler's lock
+    """
+
+    def __init__(self, flush, interval):
+        self._flush = flush
+        self._interval = interval
+        self._due = None
+        self._stopped = False
+        self._condition = threading.Condition(threading.Lock())
+        self._thread = None
+
+    def schedule(self):
+        """Call `flush` in `interval` seconds, unless already due sooner"""
+        with self._condition:
+            if self._due is None:
+                self._due = time.monotonic() + self._interval
+                self._condition.notify()
+
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+
+    def cancel(self):
+        with self._condition:
+            self._due = None
+
+    def stop(self):
+        # Not joined: the thread may be waiting for the handler's lock, held
+        # by whoever is closing the handler
+        with self._condition:
+            self._stopped = True
+            self._due = None
+            self._condition.notify()
+
+    def _run(self):
+        with self._condition:
+            while not self._stopped:
+                if self._due is None:
+                    self._condition.wait()
+
+                    continue
+
+                remaining = self._due - time.monotonic()
+
+                if remaining > 0:
+                    self._condition.wait(remaining)
+
+                    continue
+
+                self._due = None
+                self._condition.release()
+                try:
+                    self._flush()
+                except Exception:
+                    if logging.raiseExceptions:
+                        traceback.print_exc()
+                finally:
+                    self._condition.acquire()
+
+
+class RotatingFileHandler(BufferedFileHandler):
+    """A buffered file handler that rotates by size and time
+
+    When the file reaches `maxbytes` bytes, or `rotateinterval` seconds
+    after the file was opened, it is closed and renamed, and a new file is
+    started under the original name. Rotated files are named with
+    `rotation_filename`, which calls the `namer` attribute if it is set (the
+    same convention as `logging.handlers.BaseRotatingHandler`), plus a zero
+    padded counter before the extension e.g. 'app.000.log'. The counter
+    starts again at 000 whenever the name from `rotation_filename` changes,
+    so rotated files sort in the order they were rotated
+
+    Rotated files can be compressed with gzip or xz. Compression and removal
+    of old files happen on a background thread, so neither blocks logging
+
+    Arguements:
+        filename, mode, encoding, delay
+            The same as `logging.FileHandler`
+        buffersize, flushinterval, flushlevel
+            The same as `BufferedFileHandler`, except that `buffersize` is
+            counted in bytes. A `buffersize` of 0 writes every record
+            immediately
+        maxbytes : int (default `None`)
+            Rotate before the file would hold more than this many bytes,
+            encoded. If `None`, files are not rotated by size
+        rotateinterval : float (default `None`)
+            Rotate after this many seconds. If `None`, files are not rotated
+            by time
+        backupcount : int (default `None`)
+            Number of rotated files to keep. Older files rotated by this
+            handler are removed. If `None`, all rotated files are kept
+        compress : str (default `None`)
+            Compress rotated files. One of 'gzip', 'xz' or `None`
+    """
+
+    def __init__(self, filename, mode='a', encoding=None, delay=False,
+                 buffersize=0, flushinterval=None, flushlevel=logging.ERROR,
+                 maxbytes=None, rotateinterval=None, backupcount=None,
+                 compress=None):
+        if compress not in _COMPRESSORS:
+            compressors = ", ".join(repr(a_name) for a_name in _COMPRESSORS)
+            raise ValueError("'compress' must be one of: " + compressors)
+
+        super().__init__(filename, mode, encoding, delay,
+                         buffersize=buffersize, flushinterval=flushinterval,
+                         flushlevel=flushlevel)
+
+        self.maxbytes = maxbytes
+        self.rotateinterval = rotateinterval
+        self.backupcount = backupcount
+        self.compress = compress
+        self.namer = None
+
+        self._rotated = collections.deque()
+        self._jobs = None
+        self._worker = None
+        self._last_rotation = (None, -1)
+
+        # Sizes are counted in bytes, the same as the file's size on disk
+        encoding = self.encoding
+
+        if encoding is None or encoding == 'locale':
+            encoding = locale.getpreferredencoding(False)
+
+        self._length = _byte_length(encoding)
+
+        if os.path.exists(self.baseFilename) and mode.startswith('a'):
+            self._size = os.path.getsize(self.baseFilename)
+        else:
+            self._size = 0
+
+        self._rollover_at = self._next_rollover(time.time())
+
+    def rotation_filename(self, default_name):
+        if self.namer is None:
+            return default_name
+
+        return self.namer(default_name)
+
+    def close(self):
+        self.acquire()
+        try:
+            super().close()
+
+            if self._worker is not None:
+                self._jobs.put(None)
+                self._worker.join()
+                self._worker = None
+        finally:
+            self.release()
+
+    def do_rollover(self):
+        """Close the current file, rename it and start a new one"""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename):
+            name = self.rotation_filename(self.baseFilename)
+            last_name, last_counter = self._last_rotation
+            counter = last_counter + 1 if name == last_name else 0
+
+            dest, counter = _unused_filename(name, self._extension(),
+                                             counter)
+            os.replace(self.baseFilename, dest)
+
+            self._last_rotation = (name, counter)
+
+            self._submit(dest)
+
+        self._size = 0
+        self._rollover_at = self._next_rollover(time.time())
+        self.stream = self._open()
+
+    def _write_buffer(self):
+        if self._buffer and self._should_rollover():
+            self.do_rollover()
+
+        self._size += self._buffered
+
+        super()._write_buffer()
+
+    def _should_rollover(self):
+        if self.maxbytes is not None and self._size > 0:
+            if self._size + self._buffered > self.maxbytes:
+                return True
+
+        if self._rollover_at is not None:
+            if time.time() >= self._rollover_at:
+                return True
+
+        return False
+
+    def _next_rollover(self, now):
+        if self.rotateinterval is None:
+            return None
+
+        return now + self.rotateinterval
+
+    def _extension(self):
+        if self.compress is None:
+            return ''
+
+        return _COMPRESSORS[self.compress][1]
+
+    def _submit(self, path):
+        if self.compress is None and self.backupcount is None:
+            return
+
+        if self._worker is None:
+            self._jobs = queue.Queue()
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+
+        self._jobs.put(path)
+
+    def _work(self):
+        while True:
+            path = self._jobs.get()
+
+            if path is None:
+                break
+
+            try:
+                if self.compress is not None:
+                    path = _compress_file(path, self.compress)
+
+                self._rotated.append(path)
+
+                if self.backupcount is not None:
+                    while len(self._rotated) > self.backupcount:
+                        os.remove(self._rotated.popleft())
+            except OSError:
+                if logging.raiseExceptions:
+                    traceback.print_exc()
+
+
+_COMPRESSORS = {None: None, 'gzip': (gzip.open, '.gz'),
+                'xz': (lzma.open, '.xz')}
+
+
+def _compress_file(path, compress):
+    opener, extension = _COMPRESSORS[compress]
+    dest = path + extension
+
+    with open(path, 'rb') as source, opener(dest, 'wb') as target:
+        shutil.copyfileobj(source, target)
+
+    os.remove(path)
+
+    return dest
+
+
+def _unused_filename(path, compressed_extension='', counter=0):
+    """`path` with the first zero padded counter from `counter` on that is
+    not in use, before its extension e.g. 'app.000.log'
+
+    Returns:
+        tuple of (str, int). The path and its counter
+    """
+    def in_use(candidate):
+        return (os.path.exists(candidate) or
+                os.path.exists(candidate + compressed_extension))
+
+    root, extension = os.path.splitext(path)
+
+    while True:
+        candidate = "{0}.{1:03d}{2}".format(root, counter, extension)
+
+        if not in_use(candidate):
+            return candidate, counter
+
+        counter += 1
+
+
+class HandlerStats:
+    """Runtime counters for one handler
+
+    `instrument` wraps a handler's `emit`, `format` and `handleError` so that
+    every call is counted and timed. Counters are plain attributes, updated
+    while the handler holds its lock, and can be read at any time
+
+    Attributes:
+        emitted : int
+            Records passed to `emit`
+        filtered : int
+            Records not emitted because they were below the handler's level.
+            Kept up to date by `Easylog`, not by `instrument`. Calls below
+            every handler's level are rejected before they are counted
+        bytes : int
+            Length of the formatted records and their terminators, encoded
+            the way the handler writes them. For compressed output, the
+            length before compression
+        errors : int
+            Calls to `handleError` i.e. records that failed to be written
+        emit_ns, emit_max_ns : int
+            Total and longest time spent in `emit`, in nanoseconds. This
+            includes formatting
+        format_ns, format_max_ns : int
+            Total and longest time spent in `format`, in nanoseconds
+    """
+    __slots__ = ('emitted', 'filtered', 'bytes', 'errors', 'emit_ns',
+                 'emit_max_ns', 'format_ns', 'format_max_ns')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set every counter back to zero"""
+        self.emitted = 0
+        self.filtered = 0
+        self.bytes = 0
+        self.errors = 0
+        self.emit_ns = 0
+        self.emit_max_ns = 0
+        self.format_ns = 0
+        self.format_max_ns = 0
+
+    def snapshot(self):
+        """The counters as a dict, with times in seconds"""
+        return {'emitted': self.emitted, 'filtered': self.filtered,
+                'bytes': self.bytes, 'errors': self.errors,
+                'emit_time': self.emit_ns / 1e9,
+                'emit_max': self.emit_max_ns / 1e9,
+                'format_time': self.format_ns / 1e9,
+                'format_max': self.format_max_ns / 1e9}
+
+    def instrument(self, handler):
+        """Count and time `handler`'s calls to `emit`, `format` and
+        `handleError`
+        """
+        clock = time.perf_counter_ns
+        emit = handler.emit
+        handle_error = handler.handleError
+
+        # A memory logger only formats, through its target, when it writes
+        # the ring out
+        if isinstance(handler, RingBufferHandler):
+            formatting = handler.target
+        else:
+            formatting = handler
+
+        format_record = formatting.format
+        byte_length = _byte_length(_handler_encoding(formatting))
+        terminator = len(getattr(formatting, 'terminator', ''))
+
+        def timed_emit(record):
+            start = clock()
+
+            try:
+                emit(record)
+            finally:
+                elapsed = clock() - start
+
+                self.emitted += 1
+                self.emit_ns += elapsed
+
+                if elapsed > self.emit_max_ns:
+                    self.emit_max_ns = elapsed
+
+        def timed_format(record):
+            start = clock()
+            msg = format_record(record)
+            elapsed = clock() - start
+
+            self.bytes += byte_length(msg) + terminator
+            self.format_ns += elapsed
+
+            if elapsed > self.format_max_ns:
+                self.format_max_ns = elapsed
+
+            return msg
+
+        def counted_handle_error(record):
+            self.errors += 1
+            handle_error(record)
+
+        handler.emit = timed_emit
+        formatting.format = timed_format
+        handler.handleError = counted_handle_error
+
+
+class RingBufferHandler(logging.Handler):
+    """Keep the last records in memory and write them out on error
+
+    Records are stored unformatted in a fixed size ring, overwriting the
+    oldest. When a record at or above `flushlevel` arrives, or `dump` is
+    called, every record in the ring is passed to `target` in the order they
+    were logged, and the ring is emptied. Nothing is formatted until then
+
+    Arguements:
+        capacity : int
+            Number of records kept
+        target : logging.Handler
+            The handler that formats and writes the records. Its formatter is
+            also set by `setFormatter`
+        flushlevel : int (default `logging.ERROR`)
+            Records at or above this level trigger `dump`
+    """
+
+    def __init__(self, capacity, target, flushlevel=logging.ERROR):
+        if capacity < 1:
+            raise ValueError("'capacity' must be at least 1")
+
+        super().__init__()
+
+        self.capacity = capacity
+        self.target = target
+        self.flushlevel = flushlevel
+
+        self._ring = [None] * capacity
+        self._next = 0
+        self._size = 0
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def emit(self, record):
+        self._ring[self._next] = record
+        self._next = (self._next + 1) % self.capacity
+
+        if self._size < self.capacity:
+            self._size += 1
+
+        if record.levelno >= self.flushlevel:
+            self.dump()
+
+    def dump(self):
+        """Write every record in the ring to `target` and empty the ring"""
+        self.acquire()
+        try:
+            start = (self._next - self._size) % self.capacity
+
+            for offset in range(self._size):
+                index = (start + offset) % self.capacity
+
+                self.target.handle(self._ring[index])
+                self._ring[index] = None
+
+            self._size = 0
+            self.target.flush()
+        finally:
+            self.release()
+
+    def flush(self):
+        # Flushing only writes out what `target` has already been given, the
+        # ring itself is only written by `dump`
+        self.target.flush()
+
+    def close(self):
+        self.acquire()
+        try:
+            self._ring = [None] * self.capacity
+            self._size = 0
+            self.target.close()
+            super().close()
+        finally:
+            self.release()
+
+
+class MmapFileHandler(logging.Handler):
+    """A file handler that writes into a memory-mapped file
+
+    The file is grown in steps of `segmentsize` bytes and mapped into memory.
+    Records are copied into the map, so writing a record makes no system
+    call. The operating system writes the pages back to disk in the
+    background. On `close`, the file is truncated to the length of the data
+
+    Until then, the end of the file is padded with NUL bytes. A reader tailing
+    the file should stop at the first NUL byte. If the process dies before
+    `close`, the padding stays on disk, and is skipped when the file is opened
+    again in append mode
+
+    Arguements:
+        filename : str
+            Filename of the log file
+        mode : str (default 'a')
+            'a' appends to an existing file, 'w' truncates it
+        encoding : str (default 'utf-8')
+            The encoding of the file
+        segmentsize : int (default 16777216)
+            Number of bytes the file grows by whenever it is full
+    """
+    terminator = '\n'
+
+    def __init__(self, filename, mode='a', encoding='utf-8',
+                 segmentsize=16777216):
+        if mode not in ('a', 'w'):
+            raise ValueError("'mode' must be one of: 'a', 'w'")
+
+        if segmentsize < mmap.ALLOCATIONGRANULARITY:
+            errmsg = "'segmentsize' must be at least {0}"
+            raise ValueError(errmsg.format(mmap.ALLOCATIONGRANULARITY))
+
+        super().__init__()
+
+        self.baseFilename = os.path.abspath(filename)
+        self.mode = mode
+        self.encoding = encoding
+        self.segmentsize = segmentsize
+
+        # Create the file if needed, without truncating it in append mode
+        open(self.baseFilename, mode + 'b').close()
+        self._file = open(self.baseFilename, 'r+b')
+
+        self._offset = _data_length(self._file)
+        self._map = None
+        self._grow(0)
+
+    def emit(self, record):
+        try:
+            data = (self.format(record) + self.terminator).encode(
+                self.encoding)
+            end = self._offset + len(data)
+
+            if end > len(self._map):
+                self._grow(len(data))
+
+            self._map[self._offset:end] = data
+            self._offset = end
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._map is not None:
+                self._map.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None
+
+                self._file.truncate(self._offset)
+                self._file.close()
+
+            super().close()
+        finally:
+            self.release()
+
+    def _grow(self, needed):
+        # Remap instead of `mmap.resize`, which is not available everywhere
+        if self._map is not None:
+            self._map.close()
+
+        size = self._offset + needed
+        size += self.segmentsize - size % self.segmentsize
+
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+
+def _data_length(fileobj, chunksize=1048576):
+    """Length of a file without the NUL padding at its end"""
+    end = fileobj.seek(0, os.SEEK_END)
+
+    while end > 0:
+        start = max(0, end - chunksize)
+        fileobj.seek(start)
+
+        chunk = fileobj.read(end - start).rstrip(b'\0')
+
+        if chunk:
+            return start + len(chunk)
+
+        end = start
+
+    return 0
+
+
+class CompressedStreamHandler(logging.Handler):
+    """Write records through a gzip or xz compressor on a background thread
+
+    Formatted records are collected in memory. Each time the buffer is
+    written out, by size, age or level the same as `BufferedFileHandler`, it
+    is compressed as a complete gzip member or xz stream on a background
+    thread and written to the target. Concatenated members and streams are
+    valid gzip and xz files, so everything written before a crash can still
+    be read with `gzip.open`, `lzma.open`, `zcat` or `xzcat`
+
+    Arguements:
+        target : str or binary stream
+            A file path, opened in `mode`, or a binary stream. A text stream
+            with a `buffer` attribute, such as `sys.stdout`, is written
+            through its buffer. Other text streams, such as `io.StringIO`,
+            raise `ValueError`
+        compress : str (default 'gzip')
+            One of 'gzip' or 'xz'
+        mode : str (default 'a')
+            Only used if `target` is a path. 'a' appends, 'w' truncates
+        encoding : str (default 'utf-8')
+            The encoding of the text before compression
+        buffersize, flushinterval, flushlevel
+            The same as `BufferedFileHandler`
+    """
+    terminator = '\n'
+
+    def __init__(self, target, compress='gzip', mode='a', encoding='utf-8',
+                 buffersize=65536, flushinterval=1.0,
+                 flushlevel=logging.ERROR):
+        if compress not in _FRAME_COMPRESSORS:
+            compressors = ", ".join(repr(a_name)
+                                    for a_name in _FRAME_COMPRESSORS)
+            raise ValueError("'compress' must be one of: " + compressors)
+
+        super().__init__()
+
+        if isinstance(target, str):
+            self.baseFilename = os.path.abspath(target)
+            self.stream = open(self.baseFilename, mode + 'b')
+            self._owns_stream = True
+        else:
+            stream = getattr(target, 'buffer', target)
+
+            if isinstance(stream, io.TextIOBase):
+                errmsg = ("Compressed output needs a binary stream, or a text "
+                          "stream with a 'buffer' attribute")
+                raise ValueError(errmsg)
+
+            self.baseFilename = None
+            self.stream = stream
+            self._owns_stream = False
+
+        self.compress = compress
+        self.encoding = encoding
+        self.buffersize = buffersize
+        self.flushinterval = flushinterval
+        self.flushlevel = flushlevel
+
+        self._buffer = list()
+        self._buffered = 0
+        self._flusher = None
+        self._flush_scheduled = False
+        self._frames = queue.Queue()
+
+        if flushinterval is not None:
+            self._flusher = _IntervalFlusher(self._timed_submit,
+                                             flushinterval)
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+
+            self._buffer.append(msg)
+            self._buffered += len(msg)
+
+            if (self._buffered >= self.buffersize or
+                    record.levelno >= self.flushlevel):
+                self._submit_buffer()
+            elif not self._flush_scheduled and self._flusher is not None:
+                self._flusher.schedule()
+                self._flush_scheduled = True
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Compress and write everything buffered, and wait until written"""
+        self.acquire()
+        try:
+            self._submit_buffer()
+        finally:
+            self.release()
+
+        if self._worker is not None:
+            self._frames.join()
+
+    def close(self):
+        self.acquire()
+        try:
+            self._submit_buffer()
+
+            if self._flusher is not None:
+                self._flusher.stop()
+
+            if self._worker is not None:
+                self._frames.put(None)
+                self._worker.join()
+                self._worker = None
+
+            if self._owns_stream and self.stream is not None:
+                self.stream.close()
+                self.stream = None
+
+            super().close()
+        finally:
+            self.release()
+
+    def _timed_submit(self):
+        self.acquire()
+        try:
+            self._submit_buffer()
+        finally:
+            self.release()
+
+    def _submit_buffer(self):
+        if self._flush_scheduled:
+            self._flusher.cancel()
+            self._flush_scheduled = False
+
+        if not self._buffer or self._worker is None:
+            return
+
+        self._frames.put(''.join(self._buffer))
+
+        self._buffer.clear()
+        self._buffered = 0
+
+    def _work(self):
+        compress_frame = _FRAME_COMPRESSORS[self.compress]
+
+        while True:
+            text = self._frames.get()
+
+            try:
+                if text is None:
+                    break
+
+                self.stream.write(compress_frame(text.encode(self.encoding)))
+                self.stream.flush()
+            except Exception:
+                if logging.raiseExceptions:
+                    traceback.print_exc()
+            finally:
+                self._frames.task_done()
+
+
+_FRAME_COMPRESSORS = {'gzip': gzip.compress, 'xz': lzma.compress}
+
+
+class BoundedStreamHandler(logging.StreamHandler):
+    """A stream handler with a bounded buffer and a background writer
+
+    Records are formatted on the logging thread and put in a buffer of at
+    most `maxqueue` records. A background thread writes them to the stream,
+    so a slow reader on the other end of the stream only stalls the logging
+    thread when the buffer is full. What happens then depends on `overflow`:
+
+        - 'block': wait until there is room
+        - 'drop-oldest': drop the oldest buffered record
+        - 'drop-below-level': drop the new record if it is below
+          `overflowlevel`, otherwise wait until there is room
+        - 'spill-to-file': append the new record to the file `spillpath`
+
+    `close` writes out the buffer, including records from threads that were
+    waiting for room, and stops the writer. Records emitted after that are
+    written to the stream directly
+
+    Arguements:
+        stream (default `None`)
+            The same as `logging.StreamHandler`
+        maxqueue : int (default 10000)
+            Number of records buffered
+        overflow : str (default 'block')
+            What to do when the buffer is full, see above
+        overflowlevel : int (default `logging.WARNING`)
+            Only used by 'drop-below-level'
+        spillpath : str (default `None`)
+            Only used by 'spill-to-file', where it is required. The file is
+            opened in append mode when the first record spills
+
+    Attributes:
+        dropped : int
+            Number of records dropped because the buffer was full
+        spilled : int
+            Number of records written to `spillpath`
+    """
+
+    def __init__(self, stream=None, maxqueue=10000, overflow='block',
+                 overflowlevel=logging.WARNING, spillpath=None,
+                 encoding='utf-8'):
+        if overflow not in OVERFLOW_POLICIES:
+            policies = ", ".join(repr(a_name) for a_name in OVERFLOW_POLICIES)
+            raise ValueError("'overflow' must be one of: " + policies)
+
+        if overflow == 'spill-to-file' and spillpath is None:
+            raise ValueError("'spill-to-file' requires 'spillpath'")
+
+        if maxqueue < 1:
+            raise ValueError("'maxqueue' must be at least 1")
+
+        super().__init__(stream)
+
+        self.maxqueue = maxqueue
+        self.overflow = overflow
+        self.overflowlevel = overflowlevel
+        self.spillpath = spillpath
+        self.encoding = encoding
+
+        self.dropped = 0
+        self.spilled = 0
+
+        self._pending = collections.deque()
+        self._writing = False
+        self._closing = False
+        self._stopped = False
+        self._spillfile = None
+        self._condition = threading.Condition(threading.Lock())
+        self._writer = threading.Thread(target=self._write_pending,
+                                        daemon=True)
+        self._writer.start()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+
+            with self._condition:
+                if len(self._pending) >= self.maxqueue and not self._stopped:
+                    if not self._overflow(msg, record.levelno):
+                        return
+
+                if self._stopped:
+                    # The writer has drained the buffer and exited after
+                    # `close`, write in its place
+                    self.stream.write(msg)
+                    self.stream.flush()
+
+                    return
+
+                self._pending.append(msg)
+                self._condition.notify_all()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Wait until every buffered record is written"""
+        with self._condition:
+            while self._pending or self._writing:
+                if not self._writer.is_alive():
+                    break
+
+                self._condition.wait()
+
+            if self._spillfile is not None:
+                self._spillfile.flush()
+
+    def close(self):
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+
+        self._writer.join()
+
+        with self._condition:
+            if self._spillfile is not None:
+                self._spillfile.close()
+                self._spillfile = None
+
+        super().close()
+
+    def overflow_stats(self):
+        """The `dropped` and `spilled` counters as a dict"""
+        return {'dropped': self.dropped, 'spilled': self.spilled}
+
+    def _overflow(self, msg, levelno):
+        """Make room for `msg`, called with the condition held and the
+        buffer full. Returns whether `msg` should still be buffered
+        """
+        if self.overflow == 'drop-oldest':
+            self._pending.popleft()
+            self.dropped += 1
+
+            return True
+
+        if (self.overflow == 'drop-below-level' and
+                levelno < self.overflowlevel):
+            self.dropped += 1
+
+            return False
+
+        if self.overflow == 'spill-to-file':
+            if self._spillfile is None:
+                self._spillfile = open(self.spillpath, 'a',
+                                       encoding=self.encoding)
+
+            self._spillfile.write(msg)
+            self.spilled += 1
+
+            return False
+
+        while len(self._pending) >= self.maxqueue and not self._closing:
+            self._condition.wait()
+
+        return True
+
+    def _write_pending(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closing:
+                    self._condition.wait()
+
+                if not self._pending:
+                    self._stopped = True
+
+                    break
+
+                batch = ''.join(self._pending)
+                self._pending.clear()
+                self._writing = True
+                self._condition.notify_all()
+
+            try:
+                self.stream.write(batch)
+                self.stream.flush()
+            except Exception:
+                if logging.raiseExceptions:
+                    traceback.print_exc()
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+
+OVERFLOW_POLICIES = ('block', 'drop-oldest', 'drop-below-level',
+                     'spill-to-file')
+
+
+class InProcessQueueHandler(logging.handlers.QueueHandler):
+    """A `logging.handlers.QueueHandler` for a queue read in the same process
+
+    The record is put on the queue as it is, with only the message rendered
+    so that arguments changed after the call do not show. Formatting the log
+    line and any traceback is left to the handlers on the other end of the
+    queue, instead of formatting and copying the record on the calling thread
+    as `QueueHandler` does to make it picklable
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+
+        return record
+
+
+class ThreadBufferHandler(logging.Handler):
+    """Buffer records per thread and hand them to one writer thread
+
+    Logging threads never wait on a shared lock: each thread appends its
+    records to a buffer of its own, after rendering the message and any
+    traceback, and stamps them with a global sequence number. A single writer
+    thread collects the buffers of all threads, merges them by sequence number
+    and passes the records to `handlers`, whose locks are then uncontended
+
+    Records are handled in sequence number order. A thread marks the number
+    it is stamping until the record is in its buffer, and the writer leaves
+    every record from the lowest marked number on for its next batch, so a
+    record stamped but not yet appended is never overtaken
+
+    Arguements:
+        handlers : sequence of logging.Handler (default ())
+            Handlers the writer passes records to. Can be replaced later by
+            assigning a tuple to the `handlers` attribute, the same as
+            `logging.handlers.QueueListener`
+        batchsize : int (default 256)
+            A thread with this many buffered records wakes the writer
+        interval : float (default 0.05)
+            Longest time in seconds the writer sleeps between batches
+    """
+
+    def __init__(self, handlers=(), batchsize=256, interval=0.05):
+        super().__init__()
+
+        self.handlers = tuple(handlers)
+        self.batchsize = batchsize
+        self.interval = interval
+
+        self._local = threading.local()
+        # (thread, buffer, [sequence number being stamped or None])
+        self._buffers = list()
+        self._sequence = itertools.count()
+        self._passes = 0
+        self._closing = False
+        self._wakeup = threading.Event()
+        self._passes_condition = threading.Condition()
+        self._writer = threading.Thread(target=self._write_buffers,
+                                        daemon=True)
+        self._writer.start()
+
+    def handle(self, record):
+        # No handler lock, each thread only touches its own buffer
+        rv = self.filter(record)
+
+        if rv:
+            self.emit(record)
+
+        return rv
+
+    def emit(self, record):
+        try:
+            state = self._local.__dict__.get('state')
+
+            if state is None:
+                state = (threading.current_thread(), collections.deque(),
+                         [None])
+                self._local.state = state
+                self._buffers.append(state)
+
+            buffer, stamping = state[1], state[2]
+            record = self._prepare(record)
+
+            # Marked before the number is taken, so the writer knows to wait
+            # for it
+            stamping[0] = _STAMPING
+            try:
+                stamping[0] = record.easylog_seq = next(self._sequence)
+                buffer.append(record)
+            finally:
+                stamping[0] = None
+
+            if len(buffer) >= self.batchsize:
+                self._wakeup.set()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Wait until every record logged so far has been handled"""
+        # A pass already running may have missed records logged just before
+        # this call, the pass after it collects them for certain
+        with self._passes_condition:
+            target = self._passes + 2
+
+            while self._passes < target and self._writer.is_alive():
+                self._wakeup.set()
+                self._passes_condition.wait(self.interval)
+
+        for a_handler in self.handlers:
+            a_handler.flush()
+
+    def close(self):
+        self._closing = True
+        self._wakeup.set()
+        self._writer.join()
+
+        super().close()
+
+    def _prepare(self, record):
+        # The same as `logging.handlers.QueueHandler.prepare`, so the writer
+        # thread never renders messages with arguments that may have changed
+        msg = record.getMessage()
+
+        record = copy.copy(record)
+        record.message = msg
+        record.msg = msg
+        record.args = None
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = format_exception(record.exc_info)
+
+        record.exc_info = None
+
+        return record
+
+    def _watermark(self):
+        """A sequence number below which every stamped record is buffered"""
+        watermark = next(self._sequence)
+
+        for a_state in list(self._buffers):
+            stamping = a_state[2]
+
+            while True:
+                stamp = stamping[0]
+
+                if stamp is not _STAMPING:
+                    break
+
+                # Between marking and taking a number, let the thread finish
+                time.sleep(0)
+
+            if stamp is not None and stamp < watermark:
+                watermark = stamp
+
+        return watermark
+
+    def _collect(self):
+        watermark = self._watermark()
+        batches = list()
+
+        for a_state in list(self._buffers):
+            a_thread, a_buffer = a_state[0], a_state[1]
+            finished = not a_thread.is_alive()
+            batch = list()
+
+            while a_buffer and a_buffer[0].easylog_seq < watermark:
+                batch.append(a_buffer.popleft())
+
+            if batch:
+                batches.append(batch)
+            elif finished and not a_buffer:
+                self._buffers.remove(a_state)
+
+        return heapq.merge(*batches, key=_sequence_key)
+
+    def _write_buffers(self):
+        while True:
+            closing = self._closing
+
+            for record in self._collect():
+                for a_handler in self.handlers:
+                    if record.levelno >= a_handler.level:
+                        a_handler.handle(record)
+
+            with self._passes_condition:
+                self._passes += 1
+                self._passes_condition.notify_all()
+
+            if closing:
+                break
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+
+def _handler_encoding(handler):
+    """The encoding `handler` writes text in, UTF-8 if it cannot be told"""
+    encoding = getattr(handler, 'encoding', None)
+
+    if encoding is None:
+        encoding = getattr(getattr(handler, 'stream', None), 'encoding', None)
+
+    if encoding == 'locale':
+        # What `io.text_encoding` gives files opened without an encoding
+        encoding = locale.getpreferredencoding(False)
+
+    return encoding or 'utf-8'
+
+
+def _byte_length(encoding):
+    """A function returning the length of text once encoded in `encoding`
+
+    ASCII text in an ASCII compatible encoding is as long in bytes as in
+    characters, so it is only encoded to be measured when it is not ASCII
+    """
+    def encoded_length(text):
+        return len(text.encode(encoding, 'replace'))
+
+    if 'a'.encode(encoding) != b'a':
+        return encoded_length
+
+    def byte_length(text):
+        if text.isascii():
+            return len(text)
+
+        return encoded_length(text)
+
+    return byte_length
+
+
+# Marks a thread that is taking a sequence number it has not stored yet
+_STAMPING = object()
+
+
+def _sequence_key(record):
+    return record.easylog_seq
+
+
+class NetworkHandler(logging.Handler):
+    """Send records in batches to a collector over a reused connection
+
+    Formatted records are collected in memory and sent by a background
+    thread, once `batchsize` records are waiting or the oldest has waited
+    `linger` seconds. With the 'tcp' protocol, each batch is written to one
+    persistent TCP connection as newline separated records. With 'http', each
+    batch is the body of a POST request to `path`, sent over one persistent
+    HTTP connection
+
+    If sending fails, the connection is dropped and reopened after a delay
+    that doubles with every failure, up to `maxbackoff` seconds. Until then,
+    batches are appended to `spillpath`, and sent before anything else once
+    the collector is back. Spilled records may be sent twice. Without a
+    `spillpath`, batches that cannot be sent are dropped
+
+    With 'http', every batch is confirmed by the collector's response. With
+    'tcp', a connection the collector has closed is noticed before sending,
+    but one that went away without closing, or closed while a batch was on
+    its way, accepts writes until the system gives up on it, and those
+    batches are lost
+
+    Arguements:
+        host : str
+            Host name or address of the collector
+        port : int
+            Port of the collector
+        protocol : str (default 'tcp')
+            'tcp' or 'http'
+        path : str (default '/')
+            Only used by 'http'. The path records are posted to
+        batchsize : int (default 100)
+            Number of records sent at most per batch
+        linger : float (default 1.0)
+            Longest time in seconds a record waits before its batch is sent
+        spillpath : str (default `None`)
+            File for batches that could not be sent
+        maxbackoff : float (default 30.0)
+            Longest delay in seconds before reconnecting
+        timeout : float (default 5.0)
+            Timeout in seconds for connecting and sending
+        encoding : str (default 'utf-8')
+            The encoding records are sent in
+
+    Attributes:
+        dropped : int
+            Number of records that could not be sent or spilled
+        spilled : int
+            Number of records written to `spillpath`
+    """
+    terminator = '\n'
+
+    def __init__(self, host, port, protocol='tcp', path='/', batchsize=100,
+                 linger=1.0, spillpath=None, maxbackoff=30.0, timeout=5.0,
+                 encoding='utf-8'):
+        if protocol not in ('tcp', 'http'):
+            raise ValueError("'protocol' must be one of: 'tcp', 'http'")
+
+        super().__init__()
+
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.path = path
+        self.batchsize = batchsize
+        self.linger = linger
+        self.spillpath = spillpath
+        self.maxbackoff = maxbackoff
+        self.timeout = timeout
+        self.encoding = encoding
+
+        self.dropped = 0
+        self.spilled = 0
+
+        self._pending = collections.deque()
+        self._oldest = None
+        self._sending = False
+        self._closing = False
+        self._connection = None
+        self._backoff = 0
+        self._retry_at = 0
+        self._condition = threading.Condition(threading.Lock())
+        self._sender = threading.Thread(target=self._send_pending,
+                                        daemon=True)
+        self._sender.start()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+
+            with self._condition:
+                # The sender waits without a timeout while nothing is
+                # pending, so it is woken to start the linger time
+                if not self._pending:
+                    self._oldest = time.monotonic()
+                    self._condition.notify_all()
+
+                self._pending.append(msg)
+
+                if len(self._pending) >= self.batchsize:
+                    self._condition.notify_all()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Wait until every record logged so far was sent, spilled or
+        dropped
+        """
+        with self._condition:
+            self._oldest = 0
+            self._condition.notify_all()
+
+            while self._pending or self._sending:
+                if not self._sender.is_alive():
+                    break
+
+                self._condition.wait()
+
+    def close(self):
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+
+        self._sender.join()
+        self._disconnect()
+
+        super().close()
+
+    def overflow_stats(self):
+        """The `dropped` and `spilled` counters as a dict"""
+        return {'dropped': self.dropped, 'spilled': self.spilled}
+
+    def _send_pending(self):
+        while True:
+            with self._condition:
+                while not self._closing and not self._batch_ready():
+                    if self._pending:
+                        wait = self._oldest + self.linger - time.monotonic()
+                        self._condition.wait(max(0, wait))
+                    else:
+                        self._condition.wait()
+
+                if not self._pending:
+                    self._condition.notify_all()
+
+                    if self._closing:
+                        break
+
+                    continue
+
+                batch = [self._pending.popleft()
+                         for _ in range(min(self.batchsize,
+                                            len(self._pending)))]
+                self._oldest = time.monotonic() if self._pending else None
+                self._sending = True
+
+            try:
+                self._deliver(batch)
+            finally:
+                with self._condition:
+                    self._sending = False
+                    self._condition.notify_all()
+
+    def _batch_ready(self):
+        if not self._pending:
+            return False
+
+        if len(self._pending) >= self.batchsize:
+            return True
+
+        return time.monotonic() - self._oldest >= self.linger
+
+    def _deliver(self, batch):
+        if time.monotonic() >= self._retry_at:
+            try:
+                self._send_spilled()
+                self._send(''.join(batch).encode(self.encoding))
+                self._backoff = 0
+
+                return
+            except (OSError, http.client.HTTPException):
+                self._disconnect()
+                self._backoff = min(self.maxbackoff,
+                                    max(0.1, self._backoff * 2))
+                self._retry_at = time.monotonic() + self._backoff
+
+        self._spill(batch)
+
+    def _spill(self, batch):
+        if self.spillpath is None:
+            self.dropped += len(batch)
+
+            return
+
+        try:
+            with open(self.spillpath, 'a', encoding=self.encoding) as fh:
+                fh.write(''.join(batch))
+
+            self.spilled += len(batch)
+        except OSError:
+            self.dropped += len(batch)
+
+    def _send_spilled(self):
+        if self.spillpath is None or not os.path.exists(self.spillpath):
+            return
+
+        with open(self.spillpath, 'rb') as fh:
+            while True:
+                lines = fh.readlines(1048576)
+
+                if not lines:
+                    break
+
+                for start in range(0, len(lines), self.batchsize):
+                    self._send(b''.join(lines[start:start + self.batchsize]))
+
+        os.remove(self.spillpath)
+
+    def _send(self, data):
+        if self._connection is not None and self.protocol == 'tcp':
+            if _peer_closed(self._connection):
+                self._disconnect()
+
+        if self._connection is None:
+            self._connection = self._connect()
+
+        if self.protocol == 'tcp':
+            self._connection.sendall(data)
+        else:
+            headers = {'Content-Type': 'text/plain; charset=' + self.encoding}
+            self._connection.request('POST', self.path, body=data,
+                                     headers=headers)
+            response = self._connection.getresponse()
+            response.read()
+
+            if response.status >= 300:
+                errmsg = "Collector answered {0} {1}"
+                raise OSError(errmsg.format(response.status,
+                                            response.reason))
+
+    def _connect(self):
+        if self.protocol == 'tcp':
+            return socket.create_connection((self.host, self.port),
+                                            self.timeout)
+
+        return http.client.HTTPConnection(self.host, self.port,
+                                          timeout=self.timeout)
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+
+            self._connection = None
+
+
+def _peer_closed(sock):
+    """Whether the other end of `sock` has closed the connection"""
+    readable, _, _ = select.select([sock], [], [], 0)
+
+    if not readable:
+        return False
+
+    # A collector sends nothing, so a readable socket is at end of file,
+    # unless it was reset, which `recv` raises
+    return not sock.recv(1, socket.MSG_PEEK)
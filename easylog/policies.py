@@ -0,0 +1,164 @@
+import collections
+import threading
+import time
+
+
+class LogPolicy:
+    """Sampling, rate limiting and repeat suppression for one log level
+
+    Policies are checked before a record is created, so a message that is
+    dropped costs no formatting or I/O. They are applied in this order:
+
+        - Repeat suppression: a message identical to one logged less than
+          `suppressrepeats` seconds ago is dropped and counted. Once the
+          window has passed, a summary with the repeat count is logged before
+          the next message checked by the policy, whatever its text
+        - Sampling: only one in every `sample` messages is kept
+        - Rate limiting: a token bucket refilled at `ratelimit` messages per
+          second, holding at most `burst` tokens
+
+    Arguements:
+        sample : int (default `None`)
+            Keep one in every `sample` messages. If `None`, no sampling
+        ratelimit : float (default `None`)
+            Messages per second allowed on average. If `None`, no rate limit
+        burst : int (default `None`)
+            Messages allowed at once before the rate limit applies. If `None`,
+            the same as `ratelimit`, rounded up to at least 1
+        suppressrepeats : float (default `None`)
+            Window in seconds in which identical messages are collapsed. If
+            `None`, repeats are not suppressed
+        clock : callable (default `time.monotonic`)
+            Source of the current time in seconds
+
+    Attributes:
+        sampled, ratelimited, suppressed : int
+            Number of messages dropped by each policy
+    """
+    __slots__ = ('sample', 'ratelimit', 'burst', 'suppressrepeats',
+                 'sampled', 'ratelimited', 'suppressed', '_clock', '_lock',
+                 '_counter', '_tokens', '_refilled', '_repeats')
+
+    # Most messages tracked for repeats at once. The oldest is summarised
+    # early to make room for more
+    _MAX_REPEATS = 1024
+
+    def __init__(self, sample=None, ratelimit=None, burst=None,
+                 suppressrepeats=None, clock=time.monotonic):
+        if sample is not None and sample < 1:
+            raise ValueError("'sample' must be at least 1")
+
+        if ratelimit is not None and ratelimit <= 0:
+            raise ValueError("'ratelimit' must be greater than 0")
+
+        if burst is None and ratelimit is not None:
+            burst = max(1, ratelimit)
+
+        self.sample = sample
+        self.ratelimit = ratelimit
+        self.burst = burst
+        self.suppressrepeats = suppressrepeats
+
+        self.sampled = 0
+        self.ratelimited = 0
+        self.suppressed = 0
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._tokens = burst
+        self._refilled = clock()
+        # Message text to [first seen, repeat count], oldest first
+        self._repeats = collections.OrderedDict()
+
+    def check(self, msg):
+        """Decide whether `msg` is logged
+
+        Returns:
+            tuple of (bool, list of str). Whether `msg` should be logged, and
+            summaries of collapsed repeats that should be logged before it
+        """
+        summaries = list()
+
+        with self._lock:
+            now = self._clock()
+
+            if self.suppressrepeats is not None:
+                summaries.extend(self._expire(now))
+
+                text = str(msg)
+                repeat = self._repeats.get(text)
+
+                if repeat is not None:
+                    repeat[1] += 1
+                    self.suppressed += 1
+
+                    return False, summaries
+
+                if len(self._repeats) >= self._MAX_REPEATS:
+                    summaries.extend(self._expire(None))
+
+                self._repeats[text] = [now, 0]
+
+            if self.sample is not None:
+                counter = self._counter
+                self._counter = (counter + 1) % self.sample
+
+                if counter != 0:
+                    self.sampled += 1
+
+                    return False, summaries
+
+            if self.ratelimit is not None:
+                elapsed = now - self._refilled
+                self._refilled = now
+                self._tokens = min(self.burst,
+                                   self._tokens + elapsed * self.ratelimit)
+
+                if self._tokens < 1:
+                    self.ratelimited += 1
+
+                    return False, summaries
+
+                self._tokens -= 1
+
+        return True, summaries
+
+    def flush(self):
+        """Summaries of every repeat collapsed so far, clearing them"""
+        with self._lock:
+            summaries = [_summary(text, repeat[1])
+                         for text, repeat in self._repeats.items()
+                         if repeat[1] > 0]
+            self._repeats.clear()
+
+        return summaries
+
+    def _expire(self, now):
+        """Summaries of repeats whose window has passed, removing them
+
+        Entries are kept in the order they were first seen, so only the
+        oldest ones need checking. If `now` is `None`, the oldest entry is
+        removed whatever its age
+        """
+        summaries = list()
+
+        while self._repeats:
+            text, repeat = next(iter(self._repeats.items()))
+
+            if now is not None and now - repeat[0] < self.suppressrepeats:
+                break
+
+            self._repeats.popitem(last=False)
+
+            if repeat[1] > 0:
+                summaries.append(_summary(text, repeat[1]))
+
+            if now is None:
+                break
+
+        return summaries
+
+
+def _summary(text, count):
+    return "{0} (repeated {1} more times)".format(text, count)
@@ -0,0 +1,470 @@
+import bisect
+import collections
+import datetime as dt
+import json
+import os
+import re
+
+from easylog.easylog import _default_log_format
+from easylog.formatters import JsonFormatter
+from easylog.handlers import CompressedStreamHandler
+
+
+LogEntry = collections.namedtuple('LogEntry',
+                                  ['time', 'level', 'text', 'offset'])
+LogEntry.__doc__ = """A log record read back from a log file
+
+Attributes:
+    time : datetime.datetime
+        The record's time, parsed from `asctime`
+    level : str
+        The record's level name e.g. 'ERROR'
+    text : str
+        The full text of the record, including any following lines such as a
+        traceback, without the final newline
+    offset : int
+        Byte offset of the record in the log file
+"""
+
+
+class LogReader:
+    """Query log files written by Easylog by time and level
+
+    The first query builds a sidecar index next to the log file, holding the
+    byte offset of the first record in each time bucket and the offsets of
+    every record at the indexed levels. Later queries update the index with
+    whatever was written since, then seek straight to the records they need
+    instead of scanning the whole file
+
+    Records are assumed to be written in time order, which is the case for
+    a single `Easylog` file logger. Lines that do not match the log format,
+    such as tracebacks, belong to the record before them
+
+    The index file is a JSON header line followed by one JSON line per
+    update, holding only what was added to the log since the one before, so
+    keeping the index up to date only appends to it
+
+    Example:
+        All errors of the last hour::
+
+            >>> reader = easylog.LogReader.from_easylog(mylogger)
+            >>> since = datetime.datetime.now() - datetime.timedelta(hours=1)
+            >>> for entry in reader.query(start=since, levels=['error']):
+            ...     print(entry.text)
+
+    Arguements:
+        logpath : str
+            The log file. Compressed files are not supported
+        logformat : str (default `None`)
+            The log format the file was written with. It must contain
+            `%(asctime)s` and `%(levelname)s`. If `None`, the default format of
+            file loggers
+        dateformat : str (default "%Y-%m-%dT%H:%M:%S")
+            The date format the file was written with
+        bucketsize : int (default 60)
+            Number of seconds per time bucket of the index
+        indexlevels : sequence of str (default ('warning', 'error',
+                      'critical'))
+            Levels whose records are all indexed. Queries for other levels
+            scan the time range they cover
+        indexpath : str (default `None`)
+            Where the index is kept. If `None`, `logpath` plus '.idx'
+        encoding : str (default 'utf-8')
+            The encoding of the log file
+    """
+
+    def __init__(self, logpath, logformat=None, dateformat="%Y-%m-%dT%H:%M:%S",
+                 bucketsize=60, indexlevels=('warning', 'error', 'critical'),
+                 indexpath=None, encoding='utf-8'):
+        if logformat is None:
+            logformat = _default_log_format('file')
+
+        self.logpath = logpath
+        self.logformat = logformat
+        self.dateformat = dateformat
+        self.bucketsize = bucketsize
+        self.indexlevels = tuple(a_level.upper() for a_level in indexlevels)
+        self.indexpath = logpath + '.idx' if indexpath is None else indexpath
+        self.encoding = encoding
+
+        self._pattern = _compile_logformat(logformat)
+        self._index = None
+        self._indexlength = 0
+        self._parsed_time = (None, None)
+
+    @classmethod
+    def from_easylog(cls, easylogger, logname=None, **kwargs):
+        """A reader for a file written by an `Easylog` file logger
+
+        Arguements:
+            easylogger : Easylog
+                The `Easylog` the file logger was added to
+            logname : str (default `None`)
+                The name of the file logger. See `Easylog.logfile`. If `None`,
+                the first file logger
+            **kwargs
+                Passed to `LogReader`
+        """
+        logfiles = [a_file for a_file in easylogger.logfile
+                    if logname is None or a_file['logname'] == logname]
+
+        if not logfiles:
+            errmsg = "No log file of the name '{0}' was found"
+            raise ValueError(errmsg.format(logname))
+
+        handler_rec = easylogger._get_handler_record(logfiles[0]['logname'])
+        formatter = handler_rec['handler'].formatter
+
+        if isinstance(formatter, JsonFormatter):
+            errmsg = "Structured log files are not supported"
+            raise ValueError(errmsg)
+
+        if isinstance(handler_rec['handler'], CompressedStreamHandler):
+            errmsg = "Compressed log files are not supported"
+            raise ValueError(errmsg)
+
+        kwargs.setdefault('logformat', formatter._fmt)
+        kwargs.setdefault('dateformat', handler_rec['dateformat'])
+
+        return cls(logfiles[0]['filename'], **kwargs)
+
+    def index(self):
+        """Build or update the index, and return it
+
+        The index is a dict with these keys:
+            size : bytes of the log file covered
+            bucketsize : seconds per time bucket
+            buckets : list of [bucket start as a POSIX timestamp, offset]
+            levels : dict of level name to a list of offsets
+            lastbucket : bucket start of the last record read
+        """
+        if self._index is None:
+            self._index = self._load_index()
+
+        size = os.path.getsize(self.logpath)
+
+        if size < self._index['size']:
+            # The file was truncated or replaced, start again
+            self._index = self._new_index()
+            self._indexlength = 0
+
+        if size > self._index['size']:
+            update = self._update_index(self._index)
+
+            if update['size'] > update['start']:
+                _apply_update(self._index, update)
+                self._save_update(update)
+
+        return self._index
+
+    def query(self, start=None, end=None, levels=None):
+        """Records within a time range, optionally only of some levels
+
+        Arguements:
+            start : datetime.datetime (default `None`)
+                The earliest record time, inclusive. If `None`, from the
+                start of the file
+            end : datetime.datetime (default `None`)
+                The latest record time, inclusive. If `None`, to the end of
+                the file
+            levels : sequence of str (default `None`)
+                Level names e.g. ['error', 'critical']. If `None`, all levels
+
+        Yields:
+            LogEntry, in file order
+        """
+        index = self.index()
+
+        if levels is not None:
+            levels = set(a_level.upper() for a_level in levels)
+
+        first, last = self._offset_range(index, start, end)
+
+        with open(self.logpath, 'rb') as fh:
+            if levels is not None and levels <= set(self.indexlevels):
+                offsets = sorted(
+                    an_offset
+                    for a_level in levels
+                    for an_offset in index['levels'].get(a_level, ()))
+                lower = bisect.bisect_left(offsets, first)
+                upper = bisect.bisect_left(offsets, last)
+
+                for an_offset in offsets[lower:upper]:
+                    fh.seek(an_offset)
+                    entry = next(self._read_entries(fh, an_offset, last),
+                                 None)
+
+                    # None if the file changed since it was indexed, and
+                    # the offset no longer starts a complete record
+                    if entry is not None and _in_range(entry, start, end):
+                        yield entry
+            else:
+                fh.seek(first)
+
+                for entry in self._read_entries(fh, first, last):
+                    if end is not None and entry.time > end:
+                        break
+
+                    if levels is not None and entry.level not in levels:
+                        continue
+
+                    if _in_range(entry, start, end):
+                        yield entry
+
+    def _offset_range(self, index, start, end):
+        bucket_times = [a_bucket[0] for a_bucket in index['buckets']]
+        first = 0
+        last = index['size']
+
+        if start is not None and bucket_times:
+            position = bisect.bisect_right(bucket_times, start.timestamp())
+            first = index['buckets'][max(0, position - 1)][1]
+
+        if end is not None and bucket_times:
+            position = bisect.bisect_right(bucket_times, end.timestamp())
+
+            if position < len(bucket_times):
+                last = index['buckets'][position][1]
+
+        return first, last
+
+    def _read_entries(self, fh, offset, last):
+        """Records from the current position of `fh` up to offset `last`"""
+        entry = None
+        lines = list()
+
+        while offset < last:
+            line = fh.readline()
+
+            if not line.endswith(b'\n'):
+                break
+
+            text = line.decode(self.encoding).rstrip('\n')
+            match = self._pattern.match(text)
+
+            if match is not None:
+                if entry is not None:
+                    yield entry._replace(text='\n'.join(lines))
+
+                entry = LogEntry(self._parse_time(match.group('asctime')),
+                                 match.group('levelname'), None, offset)
+                lines = [text]
+            elif entry is not None:
+                lines.append(text)
+
+            offset += len(line)
+
+        if entry is not None:
+            yield entry._replace(text='\n'.join(lines))
+
+    def _parse_time(self, asctime):
+        # Consecutive records usually share the same time string
+        cached_asctime, parsed = self._parsed_time
+
+        if asctime != cached_asctime:
+            parsed = dt.datetime.strptime(asctime, self.dateformat)
+            self._parsed_time = (asctime, parsed)
+
+        return parsed
+
+    def _new_index(self):
+        return {'size': 0, 'bucketsize': self.bucketsize, 'buckets': list(),
+                'levels': {a_level: list() for a_level in self.indexlevels},
+                'lastbucket': None}
+
+    def _load_index(self):
+        """The index saved in `indexpath`, or a new one
+
+        Sets `_indexlength` to the bytes of the file holding complete,
+        consistent lines. Anything after them is overwritten by the next
+        update
+        """
+        index = self._new_index()
+        self._indexlength = 0
+
+        try:
+            with open(self.indexpath, 'rb') as fh:
+                header = fh.readline()
+
+                if (not header.endswith(b'\n') or
+                        json.loads(header.decode()) != self._header()):
+                    return index
+
+                length = len(header)
+
+                for line in fh:
+                    # A line cut short, or one written for another version
+                    # of the log, ends what can be used
+                    if not line.endswith(b'\n'):
+                        break
+
+                    try:
+                        update = _decode_update(json.loads(line.decode()))
+
+                        if update['start'] != index['size']:
+                            break
+
+                        _apply_update(index, update)
+                    except (ValueError, KeyError, TypeError):
+                        break
+
+                    length += len(line)
+        except (OSError, ValueError):
+            return self._new_index()
+
+        self._indexlength = length
+
+        return index
+
+    def _save_update(self, update):
+        line = json.dumps(_encode_update(update), separators=(',', ':'))
+        line = (line + '\n').encode()
+
+        if self._indexlength == 0:
+            header = json.dumps(self._header(), separators=(',', ':'))
+            line = (header + '\n').encode() + line
+
+            with open(self.indexpath, 'wb') as fh:
+                fh.write(line)
+        else:
+            with open(self.indexpath, 'r+b') as fh:
+                fh.seek(self._indexlength)
+                fh.truncate()
+                fh.write(line)
+
+        self._indexlength += len(line)
+
+    def _header(self):
+        return {'bucketsize': self.bucketsize,
+                'levels': sorted(self.indexlevels)}
+
+    def _update_index(self, index):
+        """What was written to the log since `index` was last updated
+
+        Returns:
+            dict with the same keys as the index, holding only the new
+            buckets and offsets, plus 'start', the size it follows on from
+        """
+        update = {'start': index['size'], 'buckets': list(),
+                  'levels': {a_level: list() for a_level in index['levels']}}
+        last_bucket = index['lastbucket']
+        offset = index['size']
+
+        with open(self.logpath, 'rb') as fh:
+            fh.seek(offset)
+
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    # A record still being written, index it next time
+                    break
+
+                match = self._pattern.match(line.decode(self.encoding))
+
+                if match is not None:
+                    moment = self._parse_time(match.group('asctime'))
+                    bucket = moment.timestamp()
+                    bucket -= bucket % self.bucketsize
+
+                    if bucket != last_bucket:
+                        update['buckets'].append([bucket, offset])
+                        last_bucket = bucket
+
+                    level = match.group('levelname')
+
+                    if level in update['levels']:
+                        update['levels'][level].append(offset)
+
+                offset += len(line)
+
+        update['size'] = offset
+        update['lastbucket'] = last_bucket
+
+        return update
+
+
+def _apply_update(index, update):
+    index['buckets'].extend(update['buckets'])
+
+    for a_level, offsets in update['levels'].items():
+        index['levels'][a_level].extend(offsets)
+
+    index['size'] = update['size']
+    index['lastbucket'] = update['lastbucket']
+
+
+def _encode_update(update):
+    """`update` with each list of level offsets stored as the differences
+    between consecutive offsets, the first from 'start', which is shorter
+    """
+    encoded = dict(update)
+    encoded['levels'] = {a_level: _deltas(offsets, update['start'])
+                         for a_level, offsets in update['levels'].items()}
+
+    return encoded
+
+
+def _decode_update(encoded):
+    update = dict(encoded)
+    update['levels'] = dict()
+
+    for a_level, deltas in encoded['levels'].items():
+        offsets = list()
+        offset = encoded['start']
+
+        for a_delta in deltas:
+            offset += a_delta
+            offsets.append(offset)
+
+        update['levels'][a_level] = offsets
+
+    return update
+
+
+def _deltas(offsets, start):
+    result = list()
+
+    for an_offset in offsets:
+        result.append(an_offset - start)
+        start = an_offset
+
+    return result
+
+
+def _in_range(entry, start, end):
+    if start is not None and entry.time < start:
+        return False
+
+    if end is not None and entry.time > end:
+        return False
+
+    return True
+
+
+def _compile_logformat(logformat):
+    """A regex matching the first line of records in `logformat`"""
+    if ('%(asctime)s' not in logformat or
+            '%(levelname)s' not in logformat):
+        errmsg = "'logformat' must contain %(asctime)s and %(levelname)s"
+        raise ValueError(errmsg)
+
+    pattern = '^'
+    position = 0
+
+    for match in re.finditer(r'%\((\w+)\)[-#0 +]*\d*(?:\.\d+)?[a-zA-Z]',
+                             logformat):
+        pattern += re.escape(logformat[position:match.start()])
+
+        if match.group(1) == 'asctime':
+            pattern += '(?P<asctime>.+?)'
+        elif match.group(1) == 'levelname':
+            pattern += '(?P<levelname>[A-Z]+)'
+        elif match.end() == len(logformat):
+            pattern += '.*'
+        else:
+            pattern += '.*?'
+
+        position = match.end()
+
+    pattern += re.escape(logformat[position:])
+
+    return re.compile(pattern)
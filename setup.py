@@ -15,9 +15,9 @@ setuptools.setup(
     license='',
     # packages=setuptools.find_packages(),
     packages=['easylog'],
+    python_requires='>=3.7',
     classifiers=[
         "Development Status :: 4 - Beta",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7"
     ]
 )
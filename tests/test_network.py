@@ -0,0 +1,237 @@
+"""NetworkHandler against stand-in collectors on localhost
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+import http.server
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+
+from easylog.handlers import NetworkHandler
+
+
+class _Collector:
+    """Records received by a stand-in collector, in order"""
+
+    def __init__(self):
+        self.lines = list()
+        self.batches = list()
+        self.condition = threading.Condition()
+
+    def add(self, data):
+        with self.condition:
+            self.batches.append(data)
+            self.lines.extend(data.decode('utf-8').splitlines())
+            self.condition.notify_all()
+
+    def wait_for(self, count, timeout=5.0):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.lines) >= count,
+                                    timeout)
+
+            return list(self.lines)
+
+
+class _TCPCollector(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0, collector=None):
+        self.collector = _Collector() if collector is None else collector
+        self.connections = set()
+
+        super().__init__(('127.0.0.1', port), _TCPRequestHandler)
+
+        self.port = self.server_address[1]
+        self.thread = threading.Thread(target=self.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+        for a_connection in list(self.connections):
+            a_connection.shutdown(socket.SHUT_RDWR)
+            a_connection.close()
+
+
+class _TCPRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.connections.add(self.request)
+
+        try:
+            while True:
+                data = self.request.recv(65536)
+
+                if not data:
+                    break
+
+                self.server.collector.add(data)
+        except OSError:
+            pass
+        finally:
+            self.server.connections.discard(self.request)
+
+
+class _HTTPCollector(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        self.collector = _Collector()
+        self.paths = list()
+        self.clients = set()
+
+        super().__init__(('127.0.0.1', 0), _HTTPRequestHandler)
+
+        self.port = self.server_address[1]
+        self.thread = threading.Thread(target=self.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+
+        self.server.paths.append(self.path)
+        self.server.clients.add(self.client_address)
+        self.server.collector.add(body)
+
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class NetworkHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = None
+        self.handler = None
+        self.workdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        if self.handler is not None:
+            self.handler.close()
+
+        if self.server is not None:
+            self.server.stop()
+
+        self.workdir.cleanup()
+
+    def _handler(self, **kwargs):
+        self.handler = NetworkHandler('127.0.0.1', self.server.port,
+                                      **kwargs)
+
+        return self.handler
+
+    def _log(self, handler, *messages):
+        record = logging.LogRecord('test_network', logging.INFO, __file__, 0,
+                                   None, None, None)
+
+        for a_message in messages:
+            record.msg = a_message
+            handler.handle(record)
+
+    def test_full_batch_is_sent_without_waiting_for_linger(self):
+        self.server = _TCPCollector()
+        handler = self._handler(batchsize=3, linger=60)
+
+        self._log(handler, 'one', 'two', 'three')
+
+        self.assertEqual(self.server.collector.wait_for(3),
+                         ['one', 'two', 'three'])
+
+    def test_linger_sends_a_partial_batch_after_idle(self):
+        self.server = _TCPCollector()
+        handler = self._handler(batchsize=100, linger=0.1)
+
+        # The sender has been idle since it started
+        time.sleep(0.2)
+        started = time.monotonic()
+        self._log(handler, 'one', 'two', 'three')
+
+        self.assertEqual(self.server.collector.wait_for(3, timeout=2.0),
+                         ['one', 'two', 'three'])
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_spills_while_down_then_replays_in_order(self):
+        self.server = _TCPCollector()
+        port = self.server.port
+        spillpath = os.path.join(self.workdir.name, 'spill.log')
+        handler = self._handler(batchsize=1, linger=0.01,
+                                spillpath=spillpath, maxbackoff=0.2)
+
+        self._log(handler, 'before')
+        self.server.collector.wait_for(1)
+
+        collector = self.server.collector
+        self.server.stop()
+        self.server = None
+
+        self._log(handler, 'down1', 'down2')
+        handler.flush()
+
+        self.assertEqual(handler.spilled, 2)
+        self.assertEqual(handler.dropped, 0)
+        self.assertGreater(handler._backoff, 0)
+        self.assertTrue(os.path.exists(spillpath))
+
+        self.server = _TCPCollector(port, collector)
+        time.sleep(0.3)
+        self._log(handler, 'after')
+        handler.flush()
+
+        self.assertEqual(collector.wait_for(4),
+                         ['before', 'down1', 'down2', 'after'])
+        self.assertEqual(handler._backoff, 0)
+        self.assertFalse(os.path.exists(spillpath))
+
+    def test_backoff_doubles_up_to_maxbackoff(self):
+        self.server = _TCPCollector()
+        self.server.stop()
+        handler = self._handler(batchsize=1, linger=0.01, maxbackoff=0.4)
+
+        backoffs = list()
+
+        for a_message in ('one', 'two', 'three', 'four'):
+            self._log(handler, a_message)
+            handler.flush()
+            backoffs.append(handler._backoff)
+            time.sleep(max(0, handler._retry_at - time.monotonic()) + 0.01)
+
+        self.server = None
+        self.assertEqual(backoffs, [0.1, 0.2, 0.4, 0.4])
+        self.assertEqual(handler.dropped, 4)
+
+    def test_http_posts_batches_on_one_connection(self):
+        self.server = _HTTPCollector()
+        handler = self._handler(protocol='http', path='/logs', batchsize=2,
+                                linger=60)
+
+        self._log(handler, 'one', 'two', 'three', 'four')
+
+        self.assertEqual(self.server.collector.wait_for(4),
+                         ['one', 'two', 'three', 'four'])
+        self.assertEqual(self.server.paths, ['/logs', '/logs'])
+        self.assertEqual(len(self.server.collector.batches), 2)
+        self.assertEqual(len(self.server.clients), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
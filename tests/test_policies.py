@@ -0,0 +1,136 @@
+"""LogPolicy sampling, rate limiting and repeat suppression on a fake clock
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+import unittest
+
+from easylog.policies import LogPolicy
+
+
+class _Clock:
+    """A clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class _SmallPolicy(LogPolicy):
+    _MAX_REPEATS = 3
+
+
+class LogPolicyTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+
+    def _allowed(self, policy, *messages):
+        return [policy.check(a_message)[0] for a_message in messages]
+
+    def test_sample_keeps_one_in_every_n(self):
+        policy = LogPolicy(sample=3, clock=self.clock)
+
+        allowed = self._allowed(policy, *map(str, range(9)))
+
+        self.assertEqual(allowed, [True, False, False] * 3)
+        self.assertEqual(policy.sampled, 6)
+
+    def test_ratelimit_allows_a_burst_then_refills(self):
+        policy = LogPolicy(ratelimit=2, burst=5, clock=self.clock)
+
+        self.assertEqual(self._allowed(policy, *'abcdef'),
+                         [True] * 5 + [False])
+
+        # Two tokens a second
+        self.clock.advance(1)
+        self.assertEqual(self._allowed(policy, *'abc'), [True, True, False])
+
+        # Never more than the burst, however long the pause
+        self.clock.advance(60)
+        self.assertEqual(self._allowed(policy, *'abcdef'),
+                         [True] * 5 + [False])
+        self.assertEqual(policy.ratelimited, 3)
+
+    def test_burst_defaults_to_ratelimit(self):
+        policy = LogPolicy(ratelimit=3, clock=self.clock)
+
+        self.assertEqual(self._allowed(policy, *'abcd'),
+                         [True, True, True, False])
+
+    def test_repeats_within_window_are_counted_then_summarised(self):
+        policy = LogPolicy(suppressrepeats=10, clock=self.clock)
+
+        self.assertEqual(self._allowed(policy, 'disk full', 'disk full',
+                                       'disk full', 'other'),
+                         [True, False, False, True])
+        self.assertEqual(policy.suppressed, 2)
+
+        self.clock.advance(9)
+        self.assertEqual(policy.check('disk full'), (False, []))
+
+        # Once the window has passed, the next message of any text carries
+        # the summary, and the text is no longer a repeat
+        self.clock.advance(1)
+        self.assertEqual(policy.check('next'),
+                         (True, ['disk full (repeated 3 more times)']))
+        self.assertEqual(policy.check('disk full'), (True, []))
+
+    def test_window_without_repeats_gives_no_summary(self):
+        policy = LogPolicy(suppressrepeats=10, clock=self.clock)
+
+        policy.check('once')
+        self.clock.advance(10)
+
+        self.assertEqual(policy.check('next'), (True, []))
+
+    def test_flush_summarises_open_windows(self):
+        policy = LogPolicy(suppressrepeats=10, clock=self.clock)
+
+        self._allowed(policy, 'a', 'a', 'b', 'c', 'c', 'c')
+
+        self.assertEqual(policy.flush(), ['a (repeated 1 more times)',
+                                          'c (repeated 2 more times)'])
+        self.assertEqual(policy.flush(), [])
+        self.assertEqual(policy.check('a'), (True, []))
+
+    def test_oldest_repeat_is_summarised_when_full(self):
+        policy = _SmallPolicy(suppressrepeats=10, clock=self.clock)
+
+        self._allowed(policy, 'a', 'a', 'b', 'c')
+
+        allowed, summaries = policy.check('d')
+
+        self.assertTrue(allowed)
+        self.assertEqual(summaries, ['a (repeated 1 more times)'])
+        self.assertEqual(list(policy._repeats), ['b', 'c', 'd'])
+
+        # 'a' was evicted, so it is logged again
+        self.assertEqual(policy.check('a'), (True, []))
+        self.assertEqual(list(policy._repeats), ['c', 'd', 'a'])
+
+    def test_suppressed_repeats_are_not_sampled_or_ratelimited(self):
+        policy = LogPolicy(sample=2, ratelimit=1, burst=1,
+                           suppressrepeats=10, clock=self.clock)
+
+        self.assertEqual(self._allowed(policy, 'a', 'a', 'a', 'b'),
+                         [True, False, False, False])
+        self.assertEqual(policy.suppressed, 2)
+        self.assertEqual(policy.sampled, 1)
+        self.assertEqual(policy.ratelimited, 0)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            LogPolicy(sample=0)
+
+        with self.assertRaises(ValueError):
+            LogPolicy(ratelimit=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
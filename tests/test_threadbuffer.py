@@ -0,0 +1,135 @@
+"""ThreadBufferHandler ordering under many logging threads
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+import collections
+import logging
+import threading
+import unittest
+
+from easylog.handlers import ThreadBufferHandler
+
+
+class _ListHandler(logging.Handler):
+    """Keeps every record it is handed, in order"""
+
+    def __init__(self):
+        super().__init__()
+
+        self.records = list()
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _GatedBuffer(collections.deque):
+    """A thread buffer whose appends wait until `gate` is set"""
+
+    def __init__(self, gate):
+        super().__init__()
+
+        self.gate = gate
+        self.waiting = threading.Event()
+
+    def append(self, record):
+        self.waiting.set()
+        self.gate.wait()
+
+        super().append(record)
+
+
+class ThreadBufferHandlerTest(unittest.TestCase):
+    threads = 8
+    records = 2000
+
+    def setUp(self):
+        self.target = _ListHandler()
+        # A short interval and small batches make the writer collect while
+        # threads are still stamping, which is where ordering can break
+        self.handler = ThreadBufferHandler([self.target], batchsize=16,
+                                           interval=0.001)
+
+    def tearDown(self):
+        self.handler.close()
+
+    def _record(self, msg, args=None):
+        return logging.LogRecord('test_threadbuffer', logging.INFO, __file__,
+                                 0, msg, args, None)
+
+    def _log(self, thread_number, start):
+        start.wait()
+
+        for a_number in range(self.records):
+            self.handler.handle(self._record('%d %d',
+                                             (thread_number, a_number)))
+
+    def _run_threads(self):
+        start = threading.Barrier(self.threads)
+        threads = [threading.Thread(target=self._log, args=(a_number, start))
+                   for a_number in range(self.threads)]
+
+        for a_thread in threads:
+            a_thread.start()
+
+        for a_thread in threads:
+            a_thread.join()
+
+        self.handler.flush()
+
+        return self.target.records
+
+    def test_records_are_handled_in_sequence_order(self):
+        records = self._run_threads()
+        sequence = [a_record.easylog_seq for a_record in records]
+
+        self.assertEqual(len(records), self.threads * self.records)
+        self.assertEqual(sequence, sorted(sequence))
+        self.assertEqual(len(set(sequence)), len(sequence))
+
+    def test_records_of_each_thread_keep_their_order(self):
+        records = self._run_threads()
+        numbers = {a_number: list() for a_number in range(self.threads)}
+
+        for a_record in records:
+            thread_number, a_number = map(int, a_record.msg.split())
+            numbers[thread_number].append(a_number)
+
+        for thread_number, thread_numbers in numbers.items():
+            self.assertEqual(thread_numbers, list(range(self.records)),
+                             thread_number)
+
+    def test_record_stamped_but_not_buffered_is_not_overtaken(self):
+        gate = threading.Event()
+        buffer = _GatedBuffer(gate)
+        # Let the thread finish even if an assertion fails
+        self.addCleanup(gate.set)
+
+        def log_slowly():
+            # The buffer of this thread, registered the way `emit` does
+            self.handler._local.state = (threading.current_thread(), buffer,
+                                         [None])
+            self.handler._buffers.append(self.handler._local.state)
+            self.handler.handle(self._record('first'))
+
+        thread = threading.Thread(target=log_slowly)
+        thread.start()
+        buffer.waiting.wait()
+
+        # Stamped after 'first', but buffered before it
+        self.handler.handle(self._record('second'))
+        self.handler.flush()
+
+        self.assertEqual(self.target.records, [])
+
+        gate.set()
+        thread.join()
+        self.handler.flush()
+
+        self.assertEqual([a_record.msg for a_record in self.target.records],
+                         ['first', 'second'])
+
+
+if __name__ == '__main__':
+    unittest.main()